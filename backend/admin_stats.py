@@ -0,0 +1,129 @@
+import sys
+
+
+# Profiles count as completed this term from this date (current AY 2024-2025)
+TERM_START = "2024-06-01"
+
+COUNTERS = ("total_students", "profiles_completed", "files_uploaded", "active_teachers", "total_teachers")
+
+# Recount of every snapshot value from the base tables
+RECOUNT_SQL = f"""
+    SELECT
+        (SELECT COUNT(DISTINCT student_id) FROM student_subjects),
+        (SELECT COUNT(*) FROM student_profiles WHERE created_at >= '{TERM_START}'),
+        (SELECT COUNT(*) FROM uploaded_files),
+        (SELECT COUNT(DISTINCT user_id) FROM uploaded_files),
+        (SELECT COUNT(*) FROM users WHERE role = 'teacher'),
+        (SELECT MAX(date_uploaded) FROM uploaded_files)
+"""
+
+
+def bump_stats(cursor, **deltas):
+    # Apply counter deltas to the snapshot row. Call it in the same transaction
+    # as the change being counted, as its last statement before the commit:
+    # the row lock is held until then, and reconcile_stats relies on it.
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    assignments = ", ".join(f"{name} = GREATEST({name} + %s, 0)" for name in deltas)
+    cursor.execute(f"UPDATE admin_stats SET {assignments} WHERE id = 1", tuple(deltas.values()))
+
+
+def lock_stats(cursor):
+    # Row lock on the snapshot, held until commit. Take it before the first
+    # consistent read of a transaction whose deltas depend on what concurrent
+    # writers committed (their bumps, and so their rows, are visible after it).
+    cursor.execute("SELECT id FROM admin_stats WHERE id = 1 FOR UPDATE")
+    cursor.fetchone()
+
+
+def new_roster_students_query():
+    # Staged masterlist students about to get their first student_subjects row
+    # (run before the insert from masterlist_staging, with the lock_stats lock
+    # held so concurrent masterlists sharing a new student count it once)
+    sql = """
+        SELECT COUNT(DISTINCT st.student_id)
+        FROM masterlist_staging st
+        WHERE st.matched = 1 AND st.first_seen = 1
+          AND NOT EXISTS (SELECT 1 FROM student_subjects ss WHERE ss.student_id = st.student_id)
+    """
+    return sql, ()
+
+
+def student_left_rosters(cursor, student_id):
+    cursor.execute("SELECT 1 FROM student_subjects WHERE student_id = %s LIMIT 1", (student_id,))
+    return cursor.fetchone() is None
+
+
+def completed_profiles(cursor, student_id):
+    cursor.execute(
+        "SELECT COUNT(*) FROM student_profiles WHERE student_id = %s AND created_at >= %s",
+        (student_id, TERM_START)
+    )
+    return cursor.fetchone()[0]
+
+
+def reconcile_stats(connection):
+    # Recount everything and overwrite the snapshot, correcting any drift.
+    # The snapshot row is locked first: writers that already bumped it have
+    # committed, so the recount (a consistent read taken after the lock)
+    # includes their rows; writers arriving later wait and bump on top.
+    connection.commit()  # start a fresh transaction/snapshot
+    cursor = connection.cursor()
+    try:
+        cursor.execute("INSERT IGNORE INTO admin_stats (id) VALUES (1)")
+        lock_stats(cursor)
+
+        cursor.execute(RECOUNT_SQL)
+        *counts, last_upload = cursor.fetchone()
+
+        cursor.execute(f"""
+            UPDATE admin_stats
+            SET {", ".join(f"{name} = %s" for name in COUNTERS)},
+                last_upload = %s, reconciled_at = NOW()
+            WHERE id = 1
+        """, (*counts, last_upload))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return dict(zip(COUNTERS, counts), last_upload=last_upload)
+
+
+def get_stats(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT {", ".join(COUNTERS)}, last_upload, reconciled_at, updated_at,
+                   TIMESTAMPDIFF(SECOND, reconciled_at, NOW())
+            FROM admin_stats WHERE id = 1
+        """)
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+
+    # Never reconciled (fresh install): build the snapshot once
+    if not row or row[-3] is None:
+        reconcile_stats(connection)
+        return get_stats(connection)
+
+    # age_seconds comes from the database clock, the one reconciled_at was written with
+    *counts, last_upload, reconciled_at, updated_at, age_seconds = row
+    return dict(zip(COUNTERS, counts), last_upload=last_upload, reconciled_at=reconciled_at,
+                updated_at=updated_at, age_seconds=age_seconds)
+
+
+if __name__ == "__main__":
+    # Periodic reconciliation, e.g. nightly from cron: python admin_stats.py
+    from migrate import connect
+
+    connection = connect()
+    try:
+        print(reconcile_stats(connection))
+    except Exception as e:
+        sys.exit(f"Stats reconciliation failed: {e}")
+    finally:
+        connection.close()
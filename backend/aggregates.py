@@ -0,0 +1,197 @@
+import hashlib
+import json
+import sys
+
+from scoring import TRAITS, TRAIT_COLUMNS
+
+
+# Key value meaning "all subjects" / "all academic years" in class_aggregates
+ALL = ""
+
+# (subject, academic_year) expressions for each roll-up level kept per teacher
+_GROUPINGS = [
+    ("ss.subject", "ss.academic_year"),
+    ("ss.subject", "''"),
+    ("''", "ss.academic_year"),
+    ("''", "''"),
+]
+
+
+def teachers_for_student(cursor, student_id):
+    cursor.execute("SELECT DISTINCT teacher_id FROM student_subjects WHERE student_id = %s", (student_id,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def new_profiles_query(academic_year, since):
+    sql = """
+        SELECT DISTINCT ss.teacher_id
+        FROM student_profiles sp
+        JOIN student_subjects ss ON ss.student_id = sp.student_id
+        WHERE sp.academic_year = %s AND sp.created_at >= %s
+    """
+    return sql, (academic_year, since)
+
+
+def teachers_for_new_profiles(cursor, academic_year, since):
+    # Teachers already rostering students whose profiles were created by an upload
+    cursor.execute(*new_profiles_query(academic_year, since))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def refresh_queries(teacher_ids):
+    # One INSERT ... SELECT per roll-up level. Students are counted once per
+    # (teacher, subject, year) group even if rostered twice.
+    format_ids = ",".join(["%s"] * len(teacher_ids))
+    totals = ", ".join(f"{col}_total" for col in TRAIT_COLUMNS)
+    inner_sums = ", ".join(f"SUM(sp.{col}) AS {col}_total" for col in TRAIT_COLUMNS)
+    outer_sums = ", ".join(f"COALESCE(SUM(g.{col}_total), 0)" for col in TRAIT_COLUMNS)
+
+    queries = []
+    for subject_expr, year_expr in _GROUPINGS:
+        sql = f"""
+            INSERT INTO class_aggregates (
+                teacher_id, subject, academic_year, student_count, {totals},
+                dominant_counts, last_upload
+            )
+            SELECT g.teacher_id, g.subject, g.academic_year, SUM(g.n), {outer_sums},
+                   JSON_OBJECTAGG(g.dominant_trait, g.n), MAX(g.last_upload)
+            FROM (
+                SELECT m.teacher_id, m.subject, m.academic_year,
+                       COALESCE(sp.dominant_trait, '') AS dominant_trait,
+                       COUNT(*) AS n, {inner_sums}, MAX(sp.created_at) AS last_upload
+                FROM (
+                    SELECT DISTINCT ss.teacher_id, {subject_expr} AS subject,
+                           {year_expr} AS academic_year, ss.student_id
+                    FROM student_subjects ss
+                    WHERE ss.teacher_id IN ({format_ids})
+                ) m
+                JOIN student_profiles sp ON sp.student_id = m.student_id
+                GROUP BY m.teacher_id, m.subject, m.academic_year, COALESCE(sp.dominant_trait, '')
+            ) g
+            GROUP BY g.teacher_id, g.subject, g.academic_year
+        """
+        queries.append((sql, tuple(teacher_ids)))
+    return queries
+
+
+def lock_teachers(cursor, teacher_ids):
+    # Serialize aggregate refreshes per teacher: the users rows stay locked
+    # until the caller commits, in id order so two refreshes can't deadlock
+    teacher_ids = sorted(set(teacher_ids))
+    if teacher_ids:
+        format_ids = ",".join(["%s"] * len(teacher_ids))
+        cursor.execute(f"SELECT id FROM users WHERE id IN ({format_ids}) ORDER BY id FOR UPDATE", tuple(teacher_ids))
+        cursor.fetchall()
+    return teacher_ids
+
+
+def refresh_teachers(cursor, teacher_ids):
+    # Recompute every aggregate row of the given teachers. Caller commits.
+    teacher_ids = lock_teachers(cursor, teacher_ids)
+    if not teacher_ids:
+        return
+
+    format_ids = ",".join(["%s"] * len(teacher_ids))
+    cursor.execute(f"DELETE FROM class_aggregates WHERE teacher_id IN ({format_ids})", tuple(teacher_ids))
+
+    for sql, params in refresh_queries(teacher_ids):
+        cursor.execute(sql, params)
+
+    # A teacher with no profiled students still gets an (empty) all-subjects
+    # row, recording that the aggregates are up to date
+    cursor.executemany("""
+        INSERT IGNORE INTO class_aggregates (teacher_id, subject, academic_year, student_count, dominant_counts)
+        VALUES (%s, '', '', 0, JSON_OBJECT())
+    """, [(teacher_id,) for teacher_id in teacher_ids])
+
+
+def refresh_all(connection):
+    # Rebuild every teacher's aggregates, one teacher per transaction
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT id FROM users WHERE role = 'teacher' ORDER BY id")
+        teacher_ids = [row[0] for row in cursor.fetchall()]
+        for teacher_id in teacher_ids:
+            refresh_teachers(cursor, [teacher_id])
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(teacher_ids)
+
+
+def teacher_aggregates_query(teacher_id, academic_year=None):
+    sql = f"""
+        SELECT subject, student_count, {", ".join(f"{col}_total" for col in TRAIT_COLUMNS)},
+               dominant_counts, last_upload
+        FROM class_aggregates
+        WHERE teacher_id = %s AND academic_year = %s AND student_count > 0
+    """
+    return sql, (teacher_id, academic_year or ALL)
+
+
+def get_teacher_aggregates(cursor, teacher_id, academic_year=None):
+    # Every subject row of one teacher (plus the all-subjects roll-up) in one
+    # round trip, keyed by subject. Read-only: the rows are kept current by the
+    # ingest/delete paths (and `python aggregates.py` for a full rebuild).
+    sql, params = teacher_aggregates_query(teacher_id, academic_year)
+    cursor.execute(sql, params)
+    return {row[0]: _aggregate_from_row(row[1:]) for row in cursor.fetchall()}
+
+
+def get_class_aggregate(cursor, teacher_id, subject=None, academic_year=None):
+    return get_teacher_aggregates(cursor, teacher_id, academic_year).get(subject or ALL)
+
+
+def _aggregate_from_row(row):
+    dominant_counts = row[6]
+    if isinstance(dominant_counts, (str, bytes)):
+        dominant_counts = json.loads(dominant_counts)
+
+    return {
+        "student_count": row[0],
+        "trait_totals": dict(zip(TRAITS, row[1:6])),
+        "dominant_counts": dominant_counts,
+        "last_upload": row[7]
+    }
+
+
+def aggregate_version(aggregate):
+    # Content hash of a class aggregate; changes whenever the class's students
+    # or their scores change (uploads, roster changes, deletes)
+    if not aggregate:
+        return "empty"
+    data = {key: aggregate[key] for key in ("student_count", "trait_totals", "dominant_counts")}
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def trait_averages(aggregate):
+    count = aggregate["student_count"]
+    return {trait: round(float(total) / count, 2) for trait, total in aggregate["trait_totals"].items()}
+
+
+def split_dominant_counts(dominant_counts):
+    # "Openness & Extraversion" counts once for each trait in the tie
+    counts = {}
+    for combo, n in dominant_counts.items():
+        if not combo:
+            continue
+        for trait in combo.split("&"):
+            trait = trait.strip()
+            counts[trait] = counts.get(trait, 0) + n
+    return counts
+
+
+if __name__ == "__main__":
+    # Full rebuild, e.g. once after migrating an existing database: python aggregates.py
+    from migrate import connect
+
+    connection = connect()
+    try:
+        print(f"Refreshed class aggregates of {refresh_all(connection)} teacher(s)")
+    except Exception as e:
+        sys.exit(f"Aggregate refresh failed: {e}")
+    finally:
+        connection.close()
@@ -1,27 +1,72 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 import pandas as pd
 import os
+import contextvars
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import openai
 import requests
 import json
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from flask_mysqldb import MySQL
 import MySQLdb.cursors
 from flask import Flask, request, jsonify, session
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, verify_jwt_in_request
+from scoring import TRAITS, TRAIT_COLUMNS, OCEAN_ORDER, answers_from_frame, scores_to_dict, trait_bands
+from ingest import CSVFormatError, ingest_masterlist, ingest_psychometric
+from jobs import JobManager, JobStore
+from db_pool import PooledMySQL, PoolTimeout
+from llm import LLMError, LLMUnavailable, create_llm_client
+from llm_cache import LLMCache
+from singleflight import SingleFlight
+from usage import QuotaExceeded, UsageGuard, UsageLedger, set_usage_context, usage_context
+from student_insights import LATEST_PROFILE_ORDER, get_student_insights, is_valid_insights, precompute_class_insights, save_student_insights
+from csv_cache import AssessmentCache
+from export import EXPORTS, FORMATS, export_query, stream_rows
+from profiles import InvalidCursor, decode_cursor, encode_cursor, estimate_profile_count, profile_filters, profile_page_query
+from admin_stats import bump_stats, completed_profiles, get_stats, lock_stats, reconcile_stats, student_left_rosters
+from aggregates import ALL as ALL_SUBJECTS, aggregate_version, get_class_aggregate, get_teacher_aggregates, refresh_teachers, split_dominant_counts, teachers_for_student
+from aggregates import trait_averages as class_trait_averages
 
 
 # Load environment variables from .env
 load_dotenv()
 
-# Initialize OpenAI
-openai.api_key = os.getenv("OPENAI_API_KEY")
-client = openai.OpenAI()
+# LLM usage accounting and admission: per-teacher call rate (token bucket)
+# and daily token quota, recorded per teacher and endpoint
+usage_ledger = UsageLedger(
+    os.getenv("LLM_USAGE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_usage.sqlite3"))
+)
+usage_guard = UsageGuard(
+    usage_ledger,
+    calls_per_minute=float(os.getenv("LLM_RATE_PER_MINUTE", 30)),
+    burst=int(os.getenv("LLM_RATE_BURST", 10)),
+    daily_token_quota=int(os.getenv("LLM_DAILY_TOKEN_QUOTA", 200000))
+)
+
+# LLM provider (LLM_PROVIDER=openai|local|stub) with timeouts, retries and a circuit breaker
+llm = create_llm_client(admit=usage_guard.admit, observe=usage_guard.observe)
+
+# Persistent response cache for the trait-keyed recommendation prompts
+llm_cache = LLMCache(
+    os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3")),
+    ttl=int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600)),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000)),
+    flush_interval=float(os.getenv("LLM_CACHE_FLUSH_SECONDS", 30))
+)
+
+# Identical prompts in flight share one upstream call: SingleFlight within this
+# process, a lease in the cache file across worker processes
+inflight = SingleFlight()
+LLM_LEASE_SECONDS = float(os.getenv("LLM_LEASE_SECONDS", 60))
+
+# Shared pool for concurrent AI calls (bounded parallelism across requests)
+ai_executor = ThreadPoolExecutor(max_workers=int(os.getenv("AI_BATCH_CONCURRENCY", 5)), thread_name_prefix="ai-call")
 
 
 # Initialize Flask app
@@ -38,13 +83,54 @@ def add_cors_headers(response):
 
 # Setup Flask-Login
 # SQL Configuration
-app.config['MYSQL_HOST'] = 'localhost'
-app.config['MYSQL_USER'] = 'root'
-app.config['MYSQL_PASSWORD'] = ''
-app.config['MYSQL_DB'] = 'insighted'
-
-# Initialize MySQL and Flask-Login
-mysql = MySQL(app)
+app.config['MYSQL_HOST'] = os.getenv('MYSQL_HOST', 'localhost')
+app.config['MYSQL_PORT'] = int(os.getenv('MYSQL_PORT', 3306))
+app.config['MYSQL_USER'] = os.getenv('MYSQL_USER', 'root')
+app.config['MYSQL_PASSWORD'] = os.getenv('MYSQL_PASSWORD', '')
+app.config['MYSQL_DB'] = os.getenv('MYSQL_DB', 'insighted')
+
+# MySQL connection pool (per worker process): open connections kept/allowed,
+# seconds to wait for a free one, max connection age, ping before reuse
+app.config['MYSQL_POOL_MIN_SIZE'] = int(os.getenv('MYSQL_POOL_MIN_SIZE', 2))
+app.config['MYSQL_POOL_MAX_SIZE'] = int(os.getenv('MYSQL_POOL_MAX_SIZE', 10))
+app.config['MYSQL_POOL_TIMEOUT'] = float(os.getenv('MYSQL_POOL_TIMEOUT', 5))
+app.config['MYSQL_POOL_RECYCLE'] = float(os.getenv('MYSQL_POOL_RECYCLE', 3600))
+app.config['MYSQL_POOL_PRE_PING'] = os.getenv('MYSQL_POOL_PRE_PING', '1').lower() in ('1', 'true', 'yes')
+
+app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
+
+# Rows per chunk for streamed CSV ingest (one batched insert + commit per chunk)
+app.config['INGEST_CHUNK_SIZE'] = int(os.getenv('INGEST_CHUNK_SIZE', 1000))
+
+# Background ingest jobs (local thread pool, no broker)
+app.config['INGEST_WORKERS'] = int(os.getenv('INGEST_WORKERS', 2))
+
+# Band granularity for individual insights/recommendations: students whose
+# trait totals fall in the same bands share one generated answer (0 = exact scores)
+app.config['INSIGHT_BAND_LEVELS'] = int(os.getenv('INSIGHT_BAND_LEVELS', 3))
+
+# Individual insight precompute: students per prompt, prompts in flight
+app.config['INSIGHTS_BATCH_SIZE'] = int(os.getenv('INSIGHTS_BATCH_SIZE', 5))
+app.config['INSIGHTS_WORKERS'] = int(os.getenv('INSIGHTS_WORKERS', 4))
+
+# Per-call timeout (seconds) for batched AI generation
+app.config['AI_CALL_TIMEOUT'] = float(os.getenv('AI_CALL_TIMEOUT', 20))
+
+# Admin exports: rows per streamed chunk, MySQL write timeout while streaming
+app.config['EXPORT_BATCH_SIZE'] = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+app.config['EXPORT_NET_WRITE_TIMEOUT'] = int(os.getenv('EXPORT_NET_WRITE_TIMEOUT', 600))
+
+# Admin stats snapshot: recount in the background when older than this (0 = only on demand/cron)
+app.config['ADMIN_STATS_RECONCILE_SECONDS'] = int(os.getenv('ADMIN_STATS_RECONCILE_SECONDS', 3600))
+# Job state lives in a SQLite file shared by the worker processes on this host
+# (uploads are staged on local disk too, so all workers must share one host)
+jobs = JobManager(
+    max_workers=app.config['INGEST_WORKERS'],
+    store=JobStore(os.getenv("JOBS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.sqlite3")))
+)
+
+# Initialize MySQL (pooled) and Flask-Login
+mysql = PooledMySQL(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 
@@ -53,33 +139,176 @@ app.config['JWT_SECRET_KEY'] = 'super-secret-key'  # Change to a strong secret i
 bcrypt = Bcrypt(app)
 jwt = JWTManager(app)
 
+# Attribute model calls made while handling this request to the caller and route
+@app.before_request
+def set_llm_usage_context():
+    teacher_id = None
+    try:
+        if verify_jwt_in_request(optional=True):
+            teacher_id = json.loads(get_jwt_identity())["id"]
+    except Exception:
+        pass
+    set_usage_context(teacher_id, request.endpoint)
+
+# Over the AI rate limit / daily token quota
+@app.errorhandler(QuotaExceeded)
+def handle_quota_exceeded(e):
+    response = jsonify({"error": f"{e}. Please try again later."})
+    if e.retry_after:
+        response.headers["Retry-After"] = str(max(1, round(e.retry_after)))
+    return response, 429
+
+# Every pooled MySQL connection busy for longer than MYSQL_POOL_TIMEOUT
+@app.errorhandler(PoolTimeout)
+def handle_pool_timeout(e):
+    print("MySQL pool exhausted:", e)
+    response = jsonify({"error": "The server is busy. Please try again shortly."})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+# Provider down (circuit open): fail fast instead of holding a worker
+@app.errorhandler(LLMUnavailable)
+def handle_llm_unavailable(e):
+    print("LLM unavailable:", e)
+    return jsonify({"error": "AI service is temporarily unavailable. Please try again later."}), 503
+
+
+ASSESSMENT_COLUMNS = ['STUDENT ID', 'STUDENT NAME', 'AGE', 'GENDER', 'YEAR LEVEL', 'Section', 'Date']
 
 def process_csv(file_path):
+    # Returns (students, skipped): rows without a student ID, with a missing or
+    # out-of-range answer, or repeating an earlier student ID are skipped and
+    # reported instead of scored. A file that can't be read raises CSVFormatError.
     try:
         df = pd.read_csv(file_path, dtype=str)
-        student_data = []
-
-        for _, row in df.iterrows():
-            student = {
-                'STUDENT ID': row['STUDENT ID'],
-                'STUDENT NAME': row['STUDENT NAME'],
-                'AGE': row['AGE'],
-                'GENDER': row['GENDER'],
-                'YEAR LEVEL': row['YEAR LEVEL'],
-                'Section': row['Section'],
-                'Date': row['Date'],
-            }
-            for i in range(1, 51):
-                student[f"Answer_{i}"] = int(row[str(i)]) if row[str(i)].isdigit() else 0
-            student_data.append(student)
+    except pd.errors.EmptyDataError:
+        raise CSVFormatError("The CSV file is empty.")
+    except (pd.errors.ParserError, UnicodeDecodeError) as e:
+        raise CSVFormatError(f"The CSV file could not be parsed: {e}")
+
+    answer_columns = [str(i) for i in range(1, 51)]
+    for col in ASSESSMENT_COLUMNS + answer_columns:
+        if col not in df.columns:
+            raise CSVFormatError(f"Missing column: {col}")
+
+    answers = answers_from_frame(df, answer_columns)
+    student_data = df[ASSESSMENT_COLUMNS].to_dict('records')
+
+    valid_answers = ((answers >= 1) & (answers <= 5)).all(axis=1)
+    students = []
+    skipped = []
+    seen = set()
+    for row_no, (student, row, valid) in enumerate(zip(student_data, answers.tolist(), valid_answers), start=2):
+        student_id = str(student['STUDENT ID']).strip() if pd.notna(student['STUDENT ID']) else ""
+        if not student_id:
+            reason = "Missing student ID"
+        elif not valid:
+            reason = "Missing or invalid answers"
+        elif student_id in seen:
+            reason = "Duplicate student ID"
+        else:
+            reason = None
 
-        return student_data
-    except Exception as e:
-        return [{"error": str(e)}]
+        if reason:
+            skipped.append({"row": row_no, "student_id": student_id, "reason": reason})
+            continue
+        seen.add(student_id)
+
+        student['STUDENT ID'] = student_id
+        for i, answer in enumerate(row, start=1):
+            student[f"Answer_{i}"] = answer
+        students.append(student)
+
+    return students, skipped
+
+assessment_cache = AssessmentCache(process_csv)
+
+TRAIT_SELECT = ", ".join(TRAIT_COLUMNS)
+
+def cached_completion(prompt, max_tokens=300, validate=None, timeout=None):
+    # Serve repeated prompts from the cache; `validate` can reject a reply
+    # (e.g. invalid JSON) so it is not stored
+    cached = llm_cache.get(llm.cache_namespace, prompt)
+    if cached is not None:
+        return cached
+
+    # Quota is per teacher: a leader's QuotaExceeded is not passed on to waiters
+    return inflight.do(
+        llm_cache.make_key(llm.cache_namespace, prompt),
+        lambda: fetch_completion(prompt, max_tokens, validate, timeout),
+        retry_on=(QuotaExceeded,)
+    )
+
+def fetch_completion(prompt, max_tokens, validate, timeout):
+    namespace = llm.cache_namespace
+
+    # Another worker is already fetching this prompt: wait for its reply, and
+    # only call the provider ourselves if that one gave up without an answer
+    leased = llm_cache.acquire_lease(namespace, prompt, LLM_LEASE_SECONDS)
+    if not leased:
+        # Never wait past the caller's own timeout (e.g. a batch deadline)
+        started = time.monotonic()
+        wait = min(timeout, LLM_LEASE_SECONDS) if timeout else LLM_LEASE_SECONDS
+        text = llm_cache.wait_for(namespace, prompt, wait)
+        if text is not None:
+            return text
+        if timeout:
+            timeout -= time.monotonic() - started
+            if timeout <= 0:
+                raise TimeoutError("Timed out waiting for another worker's reply")
+
+    try:
+        # The previous lease holder may have stored the reply just before we got the lease
+        text = llm_cache.get(namespace, prompt)
+        if text is not None:
+            return text
+
+        text = llm.complete(prompt, max_tokens=max_tokens, timeout=timeout)
+
+        if validate:
+            validate(text)
+        llm_cache.set(namespace, prompt, text)
+        return text
+    finally:
+        if leased:
+            llm_cache.release_lease(namespace, prompt)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_completion(prompt, max_tokens, finish, error_message):
+    # Forward tokens as Server-Sent Events as the model produces them; once the
+    # reply is complete `finish(text)` parses/persists it into the "done" payload.
+    # Admission (rate limit, quota, open circuit) is checked before the response starts.
+    tokens = llm.stream(prompt, max_tokens=max_tokens)
+
+    # Don't hold a pooled MySQL connection for the whole stream; `finish`
+    # checks out a fresh one to save the result
+    mysql.release()
+
+    def generate():
+        parts = []
+        try:
+            for delta in tokens:
+                parts.append(delta)
+                yield sse_event("token", {"text": delta})
+            yield sse_event("done", finish("".join(parts).strip()))
+        except Exception as e:
+            print("AI streaming failed:", e)
+            yield sse_event("error", {"error": error_message})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-def generate_ai_recommendations(dominant_trait):
+def generate_ai_recommendations(dominant_trait, bands=None):
+    # `bands` (trait -> band label) makes the prompt profile-specific while
+    # still shared by every student with the same banded profile
+    profile = f"\n    Their Big Five trait levels are: {', '.join(f'{t}: {b}' for t, b in bands.items())}." if bands else ""
     prompt = f"""
-    A student has a dominant personality trait of {dominant_trait}.
+    A student has a dominant personality trait of {dominant_trait}.{profile}
     1. Give a personalized learning recommendation for the student.
     2. Suggest an appropriate teaching strategy for the teacher.
     Format your response like this:
@@ -89,14 +318,8 @@ def generate_ai_recommendations(dominant_trait):
     """
 
     try:
-        # Use client to call OpenAI
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=300
-        )
-
-        text = response.choices[0].message.content.strip()
+        # Call the configured LLM provider (cached per dominant trait)
+        text = cached_completion(prompt)
         student_part, _, teacher_part = text.partition("Teacher Strategy:")
 
         return {
@@ -104,13 +327,53 @@ def generate_ai_recommendations(dominant_trait):
             "teacher": teacher_part.strip() or "No teacher strategy provided."
         }
 
+    except (QuotaExceeded, LLMUnavailable):
+        raise
     except Exception as e:
-        print("🔴 OpenAI error:", e)
+        print("🔴 LLM error:", e)
         return {
             "student": "Error generating student recommendation.",
             "teacher": "Error generating teacher strategy."
         }
 
+# Background ingest jobs: persist the upload, run it on the worker pool, poll /jobs/<id>
+
+def wants_async():
+    flag = request.args.get('async') or request.form.get('async') or ''
+    return flag.lower() in ('1', 'true', 'yes')
+
+def run_ingest_job(job, ingest, file_path, *args):
+    try:
+        with app.app_context(), open(file_path, 'rb') as file:
+            return ingest(mysql.connection, file, *args, app.config['INGEST_CHUNK_SIZE'], progress=job.update)
+    finally:
+        os.remove(file_path)
+
+def enqueue_ingest(kind, owner_id, file, ingest, *args):
+    job_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'jobs')
+    os.makedirs(job_dir, exist_ok=True)
+    file_path = os.path.join(job_dir, f"{uuid.uuid4().hex}.csv")
+    file.save(file_path)
+
+    job = jobs.submit(kind, owner_id, run_ingest_job, ingest, file_path, *args)
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}"
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job_status(job_id):
+    identity = json.loads(get_jwt_identity())
+
+    job = jobs.get(job_id)
+    if not job or (job.owner_id != identity["id"] and identity["role"] != "admin"):
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify(job.to_dict()), 200
+
+
 # Upload Class List CSV file
 
 @app.route('/teacher/upload-masterlist', methods=['POST'])
@@ -126,51 +389,15 @@ def upload_masterlist():
     if not file:
         return jsonify({"error": "No file uploaded."}), 400
 
-    try:
-        df = pd.read_csv(file)
-        expected_cols = {"STUDENT ID", "STUDENT NAME", "SUBJECT", "ACADEMIC YEAR", "YEAR LEVEL"}
-        if not expected_cols.issubset(set(df.columns)):
-            return jsonify({"error": "Missing required columns in CSV."}), 400
-
-        cursor = mysql.connection.cursor()
-        matched = 0
-        unmatched = 0
-        unmatched_students = []
-
-        for _, row in df.iterrows():
-            student_id = str(row["STUDENT ID"]).strip()
-            subject = str(row["SUBJECT"]).strip()
-            academic_year = str(row["ACADEMIC YEAR"]).strip()
-            year_level = str(row["YEAR LEVEL"]).strip()
-
-            # Check if student exists in psychometric profiles
-            cursor.execute("SELECT 1 FROM student_profiles WHERE student_id = %s", (student_id,))
-            if cursor.fetchone():
-                matched += 1
-
-                # Prevent duplicate student-subject mapping
-                cursor.execute("""
-                    SELECT 1 FROM student_subjects
-                    WHERE student_id = %s AND teacher_id = %s AND subject = %s AND academic_year = %s
-                """, (student_id, teacher_id, subject, academic_year))
-
-                if not cursor.fetchone():
-                    cursor.execute("""
-                        INSERT INTO student_subjects (student_id, teacher_id, subject, academic_year, year_level)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """, (student_id, teacher_id, subject, academic_year, year_level))
-            else:
-                unmatched += 1
-                unmatched_students.append(student_id)
+    if wants_async():
+        return enqueue_ingest("masterlist", teacher_id, file, ingest_masterlist, teacher_id)
 
-        mysql.connection.commit()
-        cursor.close()
+    try:
+        result = ingest_masterlist(mysql.connection, file, teacher_id, app.config['INGEST_CHUNK_SIZE'])
+        return jsonify(result)
 
-        return jsonify({
-            "matched": matched,
-            "unmatched": unmatched,
-            "unmatched_students": unmatched_students
-        })
+    except CSVFormatError as e:
+        return jsonify({"error": str(e)}), 400
 
     except Exception as e:
         print("Error processing masterlist upload:", e)
@@ -200,6 +427,14 @@ def delete_teacher_student(student_id):
         DELETE FROM student_subjects
         WHERE student_id = %s AND teacher_id = %s AND subject_code = %s AND academic_year = %s
     """, (student_id, teacher_id, subject_code, academic_year))
+    removed = cursor.rowcount
+    refresh_teachers(cursor, [teacher_id])
+    if removed:
+        # Stats row locked before the check (teacher first, as in ingest_masterlist):
+        # concurrent removals of the same student's last rosters see each other
+        lock_stats(cursor)
+        if student_left_rosters(cursor, student_id):
+            bump_stats(cursor, total_students=-1)
 
     mysql.connection.commit()
     cursor.close()
@@ -255,9 +490,19 @@ def upload_file():
     user_id = identity['id']
     file_name = file.filename
 
-    # Save with user-specific file name
+    # Save with user-specific file name; a file that can't be parsed is
+    # rejected and the previous upload stays in place
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"user_{user_id}_latest.csv")
-    file.save(file_path)
+    upload_path = os.path.join(app.config['UPLOAD_FOLDER'], f"user_{user_id}_upload.csv")
+    file.save(upload_path)
+    try:
+        students, skipped = process_csv(upload_path)
+    except CSVFormatError as e:
+        os.remove(upload_path)
+        return jsonify({"error": str(e)}), 400
+
+    os.replace(upload_path, file_path)
+    assessment_cache.invalidate(file_path)
 
     # Log in DB
     cursor = mysql.connection.cursor()
@@ -268,10 +513,30 @@ def upload_file():
     mysql.connection.commit()
     cursor.close()
 
-    return jsonify({"message": "File uploaded and saved per user."}), 200
+    return jsonify({
+        "message": "File uploaded and saved per user.",
+        "students": len(students),
+        "skipped": len(skipped),
+        "skipped_rows": skipped
+    }), 200
 
 # Teacher Dashboard - Student List
 
+def student_list_query(teacher_id, subject=None):
+    # Students linked to this teacher (filtered by subject if present), joined
+    # through student_subjects instead of shipping their ids back in an IN list
+    subject_filter = " AND subject = %s" if subject else ""
+    params = (teacher_id, subject) if subject else (teacher_id,)
+    sql = f"""
+        SELECT sp.student_id, sp.name
+        FROM (
+            SELECT DISTINCT student_id FROM student_subjects
+            WHERE teacher_id = %s{subject_filter}
+        ) ss
+        JOIN student_profiles sp ON sp.student_id = ss.student_id
+    """
+    return sql, params
+
 @app.route('/students', methods=['GET'])
 @jwt_required()
 def get_students():
@@ -280,30 +545,7 @@ def get_students():
     subject = request.args.get('subject')
 
     cursor = mysql.connection.cursor()
-
-    # Build query to get students linked to this teacher (filtered by subject if present)
-    query = "SELECT student_id FROM student_subjects WHERE teacher_id = %s"
-    params = [teacher_id]
-
-    if subject:
-        query += " AND subject = %s"
-        params.append(subject)
-
-    cursor.execute(query, tuple(params))
-    student_ids = [row[0] for row in cursor.fetchall()]
-
-    if not student_ids:
-        cursor.close()
-        return jsonify([])
-
-    # Get student names (from student_profiles or fallback table)
-    format_ids = ",".join(["%s"] * len(student_ids))
-    cursor.execute(f"""
-        SELECT student_id, name
-        FROM student_profiles
-        WHERE student_id IN ({format_ids})
-    """, tuple(student_ids))
-
+    cursor.execute(*student_list_query(teacher_id, subject))
     students = [{"student_id": row[0], "name": row[1]} for row in cursor.fetchall()]
     cursor.close()
 
@@ -328,13 +570,16 @@ def assess_individual():
     link_exists = cursor.fetchone()
 
     if not link_exists:
+        cursor.close()
         return jsonify({"error": "This student is not linked to you."}), 403
 
-    # Get the student's trait scores
-    cursor.execute("""
-        SELECT trait_scores, dominant_trait
+    # Get the student's trait scores (latest profile, the one insights use)
+    cursor.execute(f"""
+        SELECT {TRAIT_SELECT}, dominant_trait
         FROM student_profiles
         WHERE student_id = %s
+        ORDER BY {LATEST_PROFILE_ORDER}
+        LIMIT 1
     """, (student_id,))
     profile = cursor.fetchone()
     cursor.close()
@@ -343,8 +588,8 @@ def assess_individual():
         return jsonify({"error": "Student profile not found"}), 404
 
     try:
-        trait_scores = json.loads(profile[0])
-        dominant_trait = profile[1]
+        trait_scores = scores_to_dict(profile[:5])
+        dominant_trait = profile[5]
 
         # Score analysis
         highest_score = max(trait_scores.values())
@@ -367,21 +612,8 @@ def assess_individual():
 
 # Generate AI-Based Individual Insights 
 
-@app.route('/assess/individual-insights', methods=['GET'])
-@jwt_required()
-def individual_traite_insights():
-    import openai
-    import os
-    import json
-    from dotenv import load_dotenv
-
-    load_dotenv()
-    client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-    student_id = request.args.get('student_id')
-    identity = json.loads(get_jwt_identity())
-    teacher_id = identity['id']
-
+def load_linked_trait_scores(student_id, teacher_id):
+    # Returns (trait_scores, None) or (None, error response)
     cursor = mysql.connection.cursor()
 
     # Confirm student is linked to this teacher
@@ -390,46 +622,163 @@ def individual_traite_insights():
         WHERE student_id = %s AND teacher_id = %s
     """, (student_id, teacher_id))
     if not cursor.fetchone():
-        return jsonify({"error": "This student is not linked to you."}), 403
+        cursor.close()
+        return None, (jsonify({"error": "This student is not linked to you."}), 403)
 
-    # Fetch trait_scores from DB
-    cursor.execute("""
-        SELECT trait_scores FROM student_profiles
+    # Fetch trait scores from DB (latest profile, as the insights batch uses)
+    cursor.execute(f"""
+        SELECT {TRAIT_SELECT} FROM student_profiles
         WHERE student_id = %s
+        ORDER BY {LATEST_PROFILE_ORDER}
+        LIMIT 1
     """, (student_id,))
     result = cursor.fetchone()
     cursor.close()
 
     if not result:
-        return jsonify({"error": "Student profile not found"}), 404
+        return None, (jsonify({"error": "Student profile not found"}), 404)
+
+    return scores_to_dict(result), None
+
+def individual_insights_prompt(trait_scores):
+    return (
+        "You are a psychology-based teaching support AI.\n"
+        "Based on the following Big Five trait scores of a student, generate for each trait:\n"
+        "1. A one-sentence interpretation of what this score might say about the student's personality.\n"
+        "2. A one-sentence teaching recommendation to help teachers handle this student more effectively.\n"
+        "Just return a JSON object like this:\n"
+        "{ \"TraitName\": { \"interpretation\": \"...\", \"recommendation\": \"...\" } }\n\n"
+        f"Scores: {json.dumps(trait_scores)}"
+    )
 
-    try:
-        trait_scores = json.loads(result[0])
-
-        prompt = (
-            "You are a psychology-based teaching support AI.\n"
-            "Based on the following Big Five trait scores of a student, generate for each trait:\n"
-            "1. A one-sentence interpretation of what this score might say about the student's personality.\n"
-            "2. A one-sentence teaching recommendation to help teachers handle this student more effectively.\n"
-            "Just return a JSON object like this:\n"
-            "{ \"TraitName\": { \"interpretation\": \"...\", \"recommendation\": \"...\" } }\n\n"
-            f"Scores: {json.dumps(trait_scores)}"
-        )
+def band_insights_prompt(bands, levels):
+    return (
+        "You are a psychology-based teaching support AI.\n"
+        f"Based on the following Big Five trait levels of a student (a {levels}-band scale from lowest to highest), generate for each trait:\n"
+        "1. A one-sentence interpretation of what this level might say about the student's personality.\n"
+        "2. A one-sentence teaching recommendation to help teachers handle this student more effectively.\n"
+        "Just return a JSON object like this:\n"
+        "{ \"TraitName\": { \"interpretation\": \"...\", \"recommendation\": \"...\" } }\n\n"
+        f"Levels: {json.dumps(bands)}"
+    )
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=300
-        )
+def insights_prompt_for(trait_scores):
+    # With banding on, equivalent profiles produce the same prompt and so share
+    # one cached reply (at most levels^5 distinct prompts)
+    levels = app.config['INSIGHT_BAND_LEVELS']
+    if levels:
+        return band_insights_prompt(trait_bands(trait_scores, levels), levels)
+    return individual_insights_prompt(trait_scores)
+
+def validate_insights(ai_output):
+    if not is_valid_insights(json.loads(ai_output)):
+        raise ValueError("AI insights are missing traits")
+
+def generate_insights(trait_scores):
+    return json.loads(cached_completion(insights_prompt_for(trait_scores), validate=validate_insights))
+
+def stored_insights(student_id, trait_scores):
+    cursor = mysql.connection.cursor()
+    insights = get_student_insights(cursor, student_id, trait_scores)
+    cursor.close()
+    return insights
 
-        ai_output = response.choices[0].message.content.strip()
-        parsed = json.loads(ai_output)
-        return jsonify(parsed), 200
+def store_insights(student_id, trait_scores, insights):
+    cursor = mysql.connection.cursor()
+    save_student_insights(cursor, [(student_id, trait_scores, insights)], llm.model)
+    mysql.connection.commit()
+    cursor.close()
+    return insights
 
+@app.route('/assess/individual-insights', methods=['GET'])
+@jwt_required()
+def individual_traite_insights():
+    student_id = request.args.get('student_id')
+    identity = json.loads(get_jwt_identity())
+
+    trait_scores, error = load_linked_trait_scores(student_id, identity['id'])
+    if error:
+        return error
+
+    # Precomputed (or previously generated) for these exact scores
+    insights = stored_insights(student_id, trait_scores)
+    if insights:
+        return jsonify(insights), 200
+
+    # Free the pooled connection during the model call
+    mysql.release()
+
+    try:
+        insights = store_insights(student_id, trait_scores, generate_insights(trait_scores))
+        return jsonify(insights), 200
+
+    except (QuotaExceeded, LLMUnavailable):
+        raise
     except Exception as e:
         print("AI insight generation failed:", e)
         return jsonify({"error": "AI failed to generate valid insights."}), 500
 
+# Streaming variant: "token" events while generating, then "done" with the parsed JSON
+@app.route('/assess/individual-insights/stream', methods=['GET'])
+@jwt_required()
+def individual_traite_insights_stream():
+    student_id = request.args.get('student_id')
+    identity = json.loads(get_jwt_identity())
+
+    trait_scores, error = load_linked_trait_scores(student_id, identity['id'])
+    if error:
+        return error
+
+    insights = stored_insights(student_id, trait_scores)
+    if insights:
+        return Response(sse_event("done", insights), mimetype="text/event-stream")
+
+    # An equivalent profile was already generated: nothing to stream
+    prompt = insights_prompt_for(trait_scores)
+    cached = llm_cache.get(llm.cache_namespace, prompt)
+    if cached is not None:
+        insights = store_insights(student_id, trait_scores, json.loads(cached))
+        return Response(sse_event("done", insights), mimetype="text/event-stream")
+
+    def finish(ai_output):
+        validate_insights(ai_output)
+        llm_cache.set(llm.cache_namespace, prompt, ai_output)
+        return store_insights(student_id, trait_scores, json.loads(ai_output))
+
+    return stream_completion(prompt, 300, finish, "AI failed to generate valid insights.")
+
+# Batch job: generate insights for every student in the class whose scores changed
+def run_insights_job(job, teacher_id, subject):
+    # The job paces itself, so it skips the per-teacher call rate (not the token quota)
+    with app.app_context(), usage_context(teacher_id, "precompute_insights", rate_limited=False):
+        return precompute_class_insights(
+            mysql.connection, llm.complete, llm.model, teacher_id, subject,
+            batch_size=app.config['INSIGHTS_BATCH_SIZE'],
+            workers=app.config['INSIGHTS_WORKERS'],
+            progress=job.update,
+            band_insights=generate_insights if app.config['INSIGHT_BAND_LEVELS'] else None,
+            band_levels=app.config['INSIGHT_BAND_LEVELS']
+        )
+
+@app.route('/teacher/precompute-insights', methods=['POST'])
+@jwt_required()
+def precompute_insights():
+    identity = json.loads(get_jwt_identity())
+
+    if identity["role"] != "teacher":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    subject = request.args.get("subject")
+    if subject == "All":
+        subject = None
+
+    job = jobs.submit("insights", identity["id"], run_insights_job, identity["id"], subject)
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}"
+    }), 202
+
 
 # AI-Based Individual Teaching & Learning Recommendations
 
@@ -445,38 +794,19 @@ def get_recommendations():
     if not os.path.exists(file_path):
         return jsonify({"error": "No data available. Upload a CSV first."}), 400
 
-    results = process_csv(file_path)
-    student_data = next((student for student in results if str(student["STUDENT ID"]) == student_id), None)
-
-    if student_data:
-        # Calculate trait scores again
-        trait_names = {
-            "Extraversion": (1, 10),
-            "Neuroticism": (11, 20),
-            "Agreeableness": (21, 30),
-            "Conscientiousness": (31, 40),
-            "Openness": (41, 50),
-        }
-
-        trait_scores = {}
-        max_score = 0
-        dominant_traits = []
-
-        for trait, (start, end) in trait_names.items():
-            scores = [student_data.get(f"Answer_{i}", 0) for i in range(start, end + 1)]
-            avg_score = round(sum(scores) / len(scores), 2)
-            trait_scores[trait] = avg_score
-            if avg_score > max_score:
-                max_score = avg_score
-                dominant_traits = [trait]
-            elif avg_score == max_score:
-                dominant_traits.append(trait)
+    # Cached parse + scores of the user's latest CSV, O(1) lookup by student id
+    try:
+        found = assessment_cache.load(file_path).find(student_id)
+    except CSVFormatError as e:
+        return jsonify({"error": str(e)}), 400
 
-        dominant_trait = " & ".join(dominant_traits)
-        student_data["dominant_trait"] = dominant_trait
+    if found:
+        dominant_trait = found[2]
+        levels = app.config['INSIGHT_BAND_LEVELS']
+        bands = trait_bands(scores_to_dict(found[1]), levels) if levels else None
 
-        # Now use it for AI generation
-        recommendations = generate_ai_recommendations(dominant_trait)
+        # Now use it for AI generation (shared across students with the same banded profile)
+        recommendations = generate_ai_recommendations(dominant_trait, bands)
 
         return jsonify({
             "dominant_trait": dominant_trait,
@@ -490,6 +820,7 @@ def get_recommendations():
 # AI-Based General/Class Teaching Recommendation
 
 @app.route('/get-recommendation', methods=['POST'])
+@jwt_required()
 def get_class_recommendation():
     data = request.get_json()
     trait = data.get("dominant_trait", "").lower()
@@ -506,13 +837,7 @@ def get_class_recommendation():
 def generate_class_recommendation(dominant_trait):
     prompt = f"Based on the class-wide dominant personality trait: {dominant_trait}, provide general study recommendations for students and teaching strategies for educators."
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=300
-    )
-
-    text = response.choices[0].message.content.strip()
+    text = cached_completion(prompt)
     student_part, _, teacher_part = text.partition("Teacher Strategy:")
     return {
         "student": student_part.strip(),
@@ -520,76 +845,85 @@ def generate_class_recommendation(dominant_trait):
     }
 
 
-# Assess 5 personality trait and display on chart
+# Teacher Dashboard: every dashboard payload from one aggregate query
 
-@app.route('/assess/ocean-averages', methods=['GET'])
-@jwt_required()
-def get_ocean_averages():
-    identity = json.loads(get_jwt_identity())
-    teacher_id = identity["id"]
-    subject = request.args.get("subject")
+def build_teacher_dashboard(teacher_id, subject=None):
     if subject == "All":
-        subject = None 
+        subject = None
 
     cursor = mysql.connection.cursor()
+    aggregates = get_teacher_aggregates(cursor, teacher_id)
+    cursor.close()
 
-    query = "SELECT student_id FROM student_subjects WHERE teacher_id = %s"
-    params = [teacher_id]
-
-    if subject:
-        query += " AND subject = %s"
-        params.append(subject)
+    aggregate = aggregates.get(subject or ALL_SUBJECTS)
+    dashboard = {
+        "subjects": sorted(s for s in aggregates if s != ALL_SUBJECTS),
+        "stats": {
+            "total_students": 0,
+            "distinct_traits": 0,
+            "most_common_trait": None,
+            "last_upload": None
+        },
+        "ocean_averages": [],
+        "dominant_distribution": [],
+        "data_version": aggregate_version(aggregate)
+    }
 
-    cursor.execute(query, tuple(params))
-    student_ids = [row[0] for row in cursor.fetchall()]
+    if not aggregate:
+        return dashboard
 
-    if not student_ids:
-        cursor.close()
-        return jsonify([])
+    trait_counts = aggregate["dominant_counts"]
+    latest_timestamp = aggregate["last_upload"]
+    dashboard["stats"] = {
+        "total_students": aggregate["student_count"],
+        "distinct_traits": len(trait_counts),
+        "most_common_trait": max(trait_counts, key=trait_counts.get) if trait_counts else None,
+        "last_upload": latest_timestamp.strftime("%Y-%m-%d %H:%M:%S") if latest_timestamp else None
+    }
 
-    format_ids = ",".join(["%s"] * len(student_ids))
-    cursor.execute(f"""
-        SELECT trait_scores FROM student_profiles
-        WHERE student_id IN ({format_ids})
-    """, tuple(student_ids))
+    if aggregate["student_count"]:
+        averages = class_trait_averages(aggregate)
+        dashboard["ocean_averages"] = [
+            {"trait": trait, "score": averages[trait]}
+            for trait in OCEAN_ORDER
+        ]
 
-    rows = cursor.fetchall()
-    cursor.close()
+    dashboard["dominant_distribution"] = [
+        { "trait": trait, "count": count }
+        for trait, count in split_dominant_counts(trait_counts).items()
+    ]
 
-    trait_totals = {
-        "Openness": 0,
-        "Conscientiousness": 0,
-        "Extraversion": 0,
-        "Agreeableness": 0,
-        "Neuroticism": 0
-    }
-    count = 0
+    return dashboard
 
-    for row in rows:
-        try:
-            scores = json.loads(row[0])
-            for trait in trait_totals:
-                trait_totals[trait] += scores.get(trait, 0)
-            count += 1
-        except Exception as e:
-            print("Error parsing trait_scores:", e)
+@app.route('/teacher/dashboard', methods=['GET'])
+@jwt_required()
+def teacher_dashboard():
+    identity = json.loads(get_jwt_identity())
+    return jsonify(build_teacher_dashboard(identity["id"], request.args.get("subject"))), 200
 
-    if count == 0:
-        return jsonify([])
 
-    averages = [
-        {"trait": trait, "score": round(total / count, 2)}
-        for trait, total in trait_totals.items()
-    ]
+# Assess 5 personality trait and display on chart
 
-    return jsonify(averages), 200
+@app.route('/assess/ocean-averages', methods=['GET'])
+@jwt_required()
+def get_ocean_averages():
+    identity = json.loads(get_jwt_identity())
+    dashboard = build_teacher_dashboard(identity["id"], request.args.get("subject"))
+    return jsonify(dashboard["ocean_averages"]), 200
 
 
 
 #  
 
 @app.route('/uploads/<filename>')
+@jwt_required()
 def uploaded_file(filename):
+    # Only the caller's own latest assessment CSV; the folder also holds
+    # other users' files and the background job uploads
+    identity = json.loads(get_jwt_identity())
+    if filename != f"user_{identity['id']}_latest.csv":
+        return jsonify({"error": "Access denied"}), 403
+
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
 @app.route('/', methods=['GET'])
@@ -603,65 +937,8 @@ def root():
 @jwt_required()
 def dashboard_stats():
     identity = json.loads(get_jwt_identity())
-    teacher_id = identity["id"]
-
-    subject = request.args.get('subject')
-    if subject == "All":
-        subject = None
-
-    cursor = mysql.connection.cursor()
-
-    # Get student IDs linked to this teacher and subject
-    query = "SELECT student_id FROM student_subjects WHERE teacher_id = %s"
-    params = [teacher_id]
-
-    if subject:
-        query += " AND subject = %s"
-        params.append(subject)
-    
-    cursor.execute(query, tuple(params))
-    student_ids = [row[0] for row in cursor.fetchall()]
-
-    if not student_ids:
-        return jsonify({
-            "total_students": 0,
-            "distinct_traits": 0,
-            "most_common_trait": None,
-            "last_upload": None
-        })
-
-    format_ids = ",".join(["%s"] * len(student_ids))
-    cursor.execute(f"""
-        SELECT dominant_trait, created_at
-        FROM student_profiles
-        WHERE student_id IN ({format_ids})
-    """, tuple(student_ids))
-
-    rows = cursor.fetchall()
-    cursor.close()
-
-    trait_counts = {}
-    latest_timestamp = None
-
-    for trait, created_at in rows:
-        # Count each trait
-        if trait not in trait_counts:
-            trait_counts[trait] = 0
-        trait_counts[trait] += 1
-
-        # Track latest timestamp
-        if not latest_timestamp or created_at > latest_timestamp:
-            latest_timestamp = created_at
-
-    most_common_trait = max(trait_counts, key=trait_counts.get)
-    distinct_traits = len(trait_counts)
-
-    return jsonify({
-        "total_students": len(rows),
-        "distinct_traits": distinct_traits,
-        "most_common_trait": most_common_trait,
-        "last_upload": latest_timestamp.strftime("%Y-%m-%d %H:%M:%S") if latest_timestamp else None
-    })
+    dashboard = build_teacher_dashboard(identity["id"], request.args.get("subject"))
+    return jsonify(dashboard["stats"])
 
 
 # Get teacher's subject/s
@@ -670,67 +947,15 @@ def dashboard_stats():
 @jwt_required()
 def get_teacher_subjects():
     identity = json.loads(get_jwt_identity())
-    teacher_id = identity["id"]
-
-    cursor = mysql.connection.cursor()
-    cursor.execute("""
-        SELECT DISTINCT subject
-        FROM student_subjects
-        WHERE teacher_id = %s
-    """, (teacher_id,))
-    subjects = [row[0] for row in cursor.fetchall()]
-    cursor.close()
-
-    return jsonify(subjects)
+    dashboard = build_teacher_dashboard(identity["id"])
+    return jsonify(dashboard["subjects"])
 
 @app.route('/assess/dominant-distribution', methods=['GET'])
 @jwt_required()
 def dominant_trait_distribution():
     identity = json.loads(get_jwt_identity())
-    teacher_id = identity["id"]
-    subject = request.args.get("subject")
-    if subject == "All":
-        subject = None
-
-    cursor = mysql.connection.cursor()
-
-    query = "SELECT student_id FROM student_subjects WHERE teacher_id = %s"
-    params = [teacher_id]
-
-    if subject:
-        query += " AND subject = %s"
-        params.append(subject)
-
-    cursor.execute(query, tuple(params))
-    student_ids = [row[0] for row in cursor.fetchall()]
-
-    if not student_ids:
-        cursor.close()
-        return jsonify([])
-
-    format_ids = ",".join(["%s"] * len(student_ids))
-    cursor.execute(f"""
-        SELECT dominant_trait FROM student_profiles
-        WHERE student_id IN ({format_ids})
-    """, tuple(student_ids))
-
-    rows = cursor.fetchall()
-    cursor.close()
-
-    trait_counts = {}
-    for (trait,) in rows:
-        if not trait:
-            continue
-        traits = [t.strip() for t in trait.split("&")]
-        for t in traits:
-            if t not in trait_counts:
-                trait_counts[t] = 0
-            trait_counts[t] += 1
-
-    return jsonify([
-        { "trait": trait, "count": count }
-        for trait, count in trait_counts.items()
-    ])
+    dashboard = build_teacher_dashboard(identity["id"], request.args.get("subject"))
+    return jsonify(dashboard["dominant_distribution"])
 
 
 # Assess All Entries
@@ -745,100 +970,15 @@ def assess_all_students():
     if not os.path.exists(file_path):
         return jsonify({"error": "No data available. Upload a CSV first."}), 400
 
-    results = process_csv(file_path)
-    total_students = len(results)
-
-    # Trait mappings and reverse scoring
-    assessment = [
-        {"number": 1, "type": 2, "math": "-"},
-        {"number": 2, "type": 5, "math": "+"},
-        {"number": 3, "type": 1, "math": "-"},
-        {"number": 4, "type": 3, "math": "+"},
-        {"number": 5, "type": 4, "math": "+"},
-        {"number": 6, "type": 2, "math": "+"},
-        {"number": 7, "type": 5, "math": "-"},
-        {"number": 8, "type": 1, "math": "+"},
-        {"number": 9, "type": 3, "math": "-"},
-        {"number": 10, "type": 4, "math": "-"},
-        {"number": 11, "type": 2, "math": "-"},
-        {"number": 12, "type": 5, "math": "+"},
-        {"number": 13, "type": 1, "math": "-"},
-        {"number": 14, "type": 3, "math": "+"},
-        {"number": 15, "type": 4, "math": "+"},
-        {"number": 16, "type": 2, "math": "+"},
-        {"number": 17, "type": 5, "math": "-"},
-        {"number": 18, "type": 1, "math": "+"},
-        {"number": 19, "type": 3, "math": "-"},
-        {"number": 20, "type": 4, "math": "-"},
-        {"number": 21, "type": 2, "math": "-"},
-        {"number": 22, "type": 5, "math": "+"},
-        {"number": 23, "type": 1, "math": "-"},
-        {"number": 24, "type": 3, "math": "+"},
-        {"number": 25, "type": 4, "math": "+"},
-        {"number": 26, "type": 2, "math": "+"},
-        {"number": 27, "type": 5, "math": "-"},
-        {"number": 28, "type": 1, "math": "+"},
-        {"number": 29, "type": 3, "math": "-"},
-        {"number": 30, "type": 4, "math": "-"},
-        {"number": 31, "type": 2, "math": "-"},
-        {"number": 32, "type": 5, "math": "+"},
-        {"number": 33, "type": 1, "math": "-"},
-        {"number": 34, "type": 3, "math": "+"},
-        {"number": 35, "type": 4, "math": "+"},
-        {"number": 36, "type": 2, "math": "+"},
-        {"number": 37, "type": 5, "math": "-"},
-        {"number": 38, "type": 1, "math": "+"},
-        {"number": 39, "type": 3, "math": "-"},
-        {"number": 40, "type": 4, "math": "-"},
-        {"number": 41, "type": 2, "math": "-"},
-        {"number": 42, "type": 5, "math": "+"},
-        {"number": 43, "type": 1, "math": "-"},
-        {"number": 44, "type": 3, "math": "+"},
-        {"number": 45, "type": 4, "math": "+"},
-        {"number": 46, "type": 2, "math": "+"},
-        {"number": 47, "type": 5, "math": "-"},
-        {"number": 48, "type": 1, "math": "+"},
-        {"number": 49, "type": 3, "math": "-"},
-        {"number": 50, "type": 4, "math": "-"}
-    ]
-
-    trait_map = {
-        1: "Extraversion",
-        2: "Neuroticism",
-        3: "Agreeableness",
-        4: "Conscientiousness",
-        5: "Openness"
-    }
+    try:
+        parsed = assessment_cache.load(file_path)
+    except CSVFormatError as e:
+        return jsonify({"error": str(e)}), 400
+    total_students = len(parsed.students)
 
-    trait_averages = {trait: [] for trait in trait_map.values()}
-
-    for student in results:
-        student_trait_scores = {trait: [] for trait in trait_map.values()}
-
-        for i, item in enumerate(assessment):
-            raw = int(student.get(f"Answer_{i+1}", 0))
-            if item["math"] == "-":
-                if raw == 1:
-                    score = 5
-                elif raw == 2:
-                    score = 4
-                elif raw == 3:
-                    score = 3
-                elif raw == 4:
-                    score = 2
-                elif raw == 5:
-                    score = 1
-                else:
-                    score = 0  # fallback for invalid input
-            else:
-                score = raw
-
-            trait = trait_map[item["type"]]
-            student_trait_scores[trait].append(score)
-
-        for trait, scores in student_trait_scores.items():
-            total = sum(scores)
-            trait_averages[trait].append(total)
+    # Per-student trait totals (n_students x 5), scored once per file version
+    totals = parsed.totals
+    trait_averages = {trait: totals[:, j].tolist() for j, trait in enumerate(TRAITS)}
 
 
     # Prepare formatted results
@@ -861,35 +1001,72 @@ def assess_all_students():
         formatted_result += f"<h4>{trait}: <span style='color:{color};'>{total_score} ({classification})</span></h4>"
 
     dominant_trait = max(trait_average_scores.items(), key=lambda x: x[1])[0]
-    class_insight = generate_class_recommendation(dominant_trait)
+    class_insight, last_updated, stale = versioned_class_recommendation(user_id, parsed.version, dominant_trait)
 
     return jsonify({
         "result": formatted_result,
         "dominant_trait": dominant_trait,
         "trait_scores": trait_average_scores,
         "total_students": total_students,
-        "class_recommendation": class_insight
+        "class_recommendation": class_insight,
+        "data_version": parsed.version,
+        "last_updated": last_updated,
+        "stale": stale
     }), 200
 
+def versioned_class_recommendation(user_id, data_version, dominant_trait):
+    # Reuse the stored recommendation while the uploaded data is unchanged;
+    # regenerate on a new version, falling back to the old copy (stale) on failure
+    cursor = mysql.connection.cursor()
+    cursor.execute("""
+        SELECT data_version, recommendation, updated_at
+        FROM class_recommendations WHERE user_id = %s
+    """, (user_id,))
+    row = cursor.fetchone()
+    cursor.close()
 
-# Generate AI-powered Insights
+    if row and row[0] == data_version:
+        return json.loads(row[1]), row[2].strftime("%Y-%m-%d %H:%M:%S"), False
 
-@app.route('/get-insights', methods=['GET'])
-def get_insights():
-    teacher_id = request.args.get('teacher_id')
-    subject = request.args.get('subject')
+    # Free the pooled connection during the model call
+    mysql.release()
 
-    print("🔍 GET Insights called with:", teacher_id, subject)
+    try:
+        recommendation = generate_class_recommendation(dominant_trait)
+    except LLMError as e:
+        if not row:
+            raise
+        print("Serving stale class recommendation:", e)
+        return json.loads(row[1]), row[2].strftime("%Y-%m-%d %H:%M:%S"), True
 
-    if not teacher_id or subject is None:
-        return jsonify({"error": "Missing teacher_id or subject"}), 400
+    cursor = mysql.connection.cursor()
+    cursor.execute("""
+        INSERT INTO class_recommendations (user_id, data_version, dominant_trait, recommendation)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            data_version = VALUES(data_version),
+            dominant_trait = VALUES(dominant_trait),
+            recommendation = VALUES(recommendation)
+    """, (user_id, data_version, dominant_trait, json.dumps(recommendation)))
+    mysql.connection.commit()
+    cursor.close()
 
-    if subject == "All":
-        subject = "General"
+    return recommendation, time.strftime("%Y-%m-%d %H:%M:%S"), False
+
+
+# Generate AI-powered Insights
+
+def class_data_version(teacher_id, subject):
+    # "General" insights cover all of the teacher's subjects
+    cursor = mysql.connection.cursor()
+    aggregate = get_class_aggregate(cursor, teacher_id, None if subject in ("General", "All") else subject)
+    cursor.close()
+    return aggregate_version(aggregate)
 
+def latest_insights(teacher_id, subject):
     cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
     cursor.execute("""
-        SELECT key_findings, recommendations, created_at
+        SELECT key_findings, recommendations, data_version, created_at
         FROM insights
         WHERE teacher_id = %s AND subject = %s
         ORDER BY created_at DESC
@@ -898,28 +1075,47 @@ def get_insights():
 
     row = cursor.fetchone()
     cursor.close()
+    return row
 
-    if not row:
-        return jsonify({"key_findings": [], "recommendations": [], "last_updated": None})
-
-    return jsonify({
+def insights_payload(row, current_version):
+    return {
         "key_findings": json.loads(row['key_findings']),
         "recommendations": json.loads(row['recommendations']),
-        "last_updated": row['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-    })
+        "last_updated": row['created_at'].strftime("%Y-%m-%d %H:%M:%S"),
+        "data_version": row['data_version'],
+        "stale": row['data_version'] != current_version
+    }
 
-#Student Grouped by dominant trait
-@app.route("/teacher/clustered-students", methods=["GET"])
-@jwt_required()
-def get_clustered_students():
-    identity = json.loads(get_jwt_identity())
-    teacher_id = identity["id"]
-    subject = request.args.get("subject")
-    academic_year = request.args.get("academic_year")
+@app.route('/get-insights', methods=['GET'])
+def get_insights():
+    teacher_id = request.args.get('teacher_id')
+    subject = request.args.get('subject')
 
-    if identity["role"] != "teacher":
-        return jsonify({"error": "Unauthorized"}), 403
+    print("🔍 GET Insights called with:", teacher_id, subject)
+
+    if not teacher_id or subject is None:
+        return jsonify({"error": "Missing teacher_id or subject"}), 400
 
+    if subject == "All":
+        subject = "General"
+
+    row = latest_insights(teacher_id, subject)
+    current_version = class_data_version(teacher_id, subject)
+
+    if not row:
+        return jsonify({
+            "key_findings": [],
+            "recommendations": [],
+            "last_updated": None,
+            "data_version": None,
+            "current_version": current_version,
+            "stale": True
+        })
+
+    return jsonify(dict(insights_payload(row, current_version), current_version=current_version))
+
+#Student Grouped by dominant trait
+def load_trait_clusters(teacher_id, subject=None, academic_year=None):
     cursor = mysql.connection.cursor()
 
     sql = """
@@ -948,46 +1144,102 @@ def get_clustered_students():
         for trait in traits:
             clusters.setdefault(trait, []).append({"id": student_id, "name": name})
 
-    return jsonify(clusters)
-
+    return clusters
 
-# Cont: AI-powered teaching recommendation per trait for TraitCluster
-@app.route("/teacher/trait-intervention", methods=["GET"])
+@app.route("/teacher/clustered-students", methods=["GET"])
 @jwt_required()
-def trait_intervention():
-    trait = request.args.get("trait")
+def get_clustered_students():
+    identity = json.loads(get_jwt_identity())
 
-    if not trait:
-        return jsonify({"error": "Missing trait"}), 400
+    if identity["role"] != "teacher":
+        return jsonify({"error": "Unauthorized"}), 403
 
+    clusters = load_trait_clusters(identity["id"], request.args.get("subject"), request.args.get("academic_year"))
+    return jsonify(clusters)
+
+
+# Cont: AI-powered teaching recommendation per trait for TraitCluster
+def generate_trait_intervention(trait, timeout=None):
     prompt = (
         f"Based on the Big Five Personality Trait model, provide a JSON object with a single key "
         f"called 'recommendation' that describes classroom teaching strategies suitable for students "
         f"with dominant '{trait}' personality. Be concise and actionable."
     )
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=300
-        )
+    ai_output = cached_completion(prompt, validate=json.loads, timeout=timeout)
+    print("🔍 Raw AI output:", ai_output)  # Optional: for debugging
 
-        ai_output = response.choices[0].message.content.strip()
-        print("🔍 Raw AI output:", ai_output)  # Optional: for debugging
+    parsed = json.loads(ai_output)  # Must be a valid JSON object
+    return parsed.get("recommendation", "No recommendation provided.")
+
+@app.route("/teacher/trait-intervention", methods=["GET"])
+@jwt_required()
+def trait_intervention():
+    trait = request.args.get("trait")
 
-        parsed = json.loads(ai_output)  # Must be a valid JSON object
+    if not trait:
+        return jsonify({"error": "Missing trait"}), 400
 
+    try:
         return jsonify({
             "trait": trait,
-            "recommendation": parsed.get("recommendation", "No recommendation provided.")
+            "recommendation": generate_trait_intervention(trait)
         }), 200
 
+    except (QuotaExceeded, LLMUnavailable):
+        raise
     except Exception as e:
         print("❌ AI generation failed:", e)
         return jsonify({"error": "Failed to generate teaching recommendation."}), 500
 
 
+def run_before_deadline(deadline, func, *args):
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("Deadline passed before the call started")
+    return func(*args, timeout=remaining)
+
+
+# Batch: clusters + interventions for every cluster, generated concurrently
+@app.route("/teacher/clustered-interventions", methods=["GET"])
+@jwt_required()
+def clustered_interventions():
+    identity = json.loads(get_jwt_identity())
+
+    if identity["role"] != "teacher":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    clusters = load_trait_clusters(identity["id"], request.args.get("subject"), request.args.get("academic_year"))
+    # Nothing else to read or write: free the pooled connection for the model calls
+    mysql.release()
+
+    # Bounded by the shared AI pool and one deadline for the whole batch: a call
+    # gets the time left as its client timeout, and one still queued when the
+    # deadline passes returns without calling the provider
+    deadline = time.monotonic() + app.config['AI_CALL_TIMEOUT']
+    futures = {
+        trait: ai_executor.submit(contextvars.copy_context().run, run_before_deadline, deadline, generate_trait_intervention, trait)
+        for trait in clusters
+    }
+
+    recommendations = {}
+    errors = {}
+    for trait, future in futures.items():
+        try:
+            recommendations[trait] = future.result(timeout=max(0, deadline - time.monotonic()))
+        except (QuotaExceeded, LLMUnavailable):
+            raise
+        except Exception as e:
+            print(f"❌ AI generation failed for {trait}:", e)
+            errors[trait] = "Failed to generate teaching recommendation."
+
+    return jsonify({
+        "clusters": clusters,
+        "recommendations": recommendations,
+        "errors": errors
+    }), 200
+
+
 # Class Profile for generate-key-findings route
 
 @app.route('/class-profile-summary', methods=['GET'])
@@ -997,49 +1249,18 @@ def class_profile_summary():
     teacher_id = identity['id']
     subject = request.args.get('subject')
 
-    cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-
-    if subject == "All" or subject is None or subject == "General":
-        cursor.execute("""
-            SELECT sp.trait_scores, sp.dominant_trait
-            FROM student_profiles sp
-            JOIN student_subjects ss ON sp.student_id = ss.student_id
-            WHERE ss.teacher_id = %s
-        """, (teacher_id,))
-    else:
-        cursor.execute("""
-            SELECT sp.trait_scores, sp.dominant_trait
-            FROM student_profiles sp
-            JOIN student_subjects ss ON sp.student_id = ss.student_id
-            WHERE ss.teacher_id = %s AND ss.subject = %s
-        """, (teacher_id, subject))
+    if subject == "All" or subject == "General":
+        subject = None
 
-    rows = cursor.fetchall()
+    cursor = mysql.connection.cursor()
+    aggregate = get_class_aggregate(cursor, teacher_id, subject)
     cursor.close()
 
-    if not rows:
+    if not aggregate:
         return jsonify({"error": "No student data found."}), 404
 
-    trait_totals = {}
-    trait_counts = {}
-    dominant_tracker = {}
-
-    for row in rows:
-        traits = json.loads(row['trait_scores'])
-        for trait, value in traits.items():
-            trait_totals[trait] = trait_totals.get(trait, 0) + value
-            trait_counts[trait] = trait_counts.get(trait, 0) + 1
-
-        # Track dominant traits
-        dom = row['dominant_trait']
-        for t in dom.split(" & "):
-            dominant_tracker[t] = dominant_tracker.get(t, 0) + 1
-
-    # Compute averages
-    average_scores = {
-        trait: round(trait_totals[trait] / trait_counts[trait], 2)
-        for trait in trait_totals
-    }
+    average_scores = class_trait_averages(aggregate)
+    dominant_tracker = split_dominant_counts(aggregate["dominant_counts"])
 
     # Find highest & lowest scoring traits
     sorted_traits = sorted(average_scores.items(), key=lambda x: x[1], reverse=True)
@@ -1053,14 +1274,15 @@ def class_profile_summary():
         "average_scores": average_scores,
         "highest_trait": highest_trait,
         "lowest_trait": lowest_trait,
-        "most_common_trait": most_common_trait
+        "most_common_trait": most_common_trait,
+        "data_version": aggregate_version(aggregate)
     })
 
 
 # Insight Tab: Generate AI-powered Key Finding & Recommendations
 
-@app.route('/generate-key-findings', methods=['POST'])
-def generate_key_findings():
+def read_key_findings_request():
+    # Returns ((class_profile, teacher_id, subject), None) or (None, error response)
     data = request.get_json()
     class_profile = data.get("class_profile", {})
     teacher_id = data.get("teacher_id")
@@ -1070,16 +1292,23 @@ def generate_key_findings():
 
     # Explicit validation
     if not class_profile:
-        return jsonify({"error": "Missing class profile"}), 400
+        return None, (jsonify({"error": "Missing class profile"}), 400)
     if not teacher_id:
-        return jsonify({"error": "Missing teacher_id"}), 400
+        return None, (jsonify({"error": "Missing teacher_id"}), 400)
     if subject is None:
-        return jsonify({"error": "Missing subject"}), 400
+        return None, (jsonify({"error": "Missing subject"}), 400)
+
+    identity = json.loads(get_jwt_identity())
+    if identity["role"] != "admin" and str(teacher_id) != str(identity["id"]):
+        return None, (jsonify({"error": "Unauthorized"}), 403)
 
     if subject == "All":
         subject = "General"
 
-    prompt = (
+    return (class_profile, teacher_id, subject), None
+
+def key_findings_prompt(class_profile):
+    return (
         f"You are given a class personality analysis. Here are the stats:\n"
         f"- Average Trait Scores: {class_profile.get('average_scores', {})}\n"
         f"- Most Common Dominant Trait: {class_profile.get('most_common_dominant_trait', 'Unknown')}\n"
@@ -1093,13 +1322,7 @@ def generate_key_findings():
         f"Key Findings:\n- ...\nRecommendations:\n- ..."
     )
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=500
-    )
-
-    content = response.choices[0].message.content.strip()
+def save_key_findings(teacher_id, subject, content, data_version):
     sections = content.split("Recommendations:")
 
     key_findings = sections[0].replace("Key Findings:", "").strip().split("\n")
@@ -1108,24 +1331,86 @@ def generate_key_findings():
     cleaned_findings = [kf.strip("- ").strip() for kf in key_findings if kf.strip()]
     cleaned_recommendations = [r.strip("- ").strip() for r in recommendations if r.strip()]
 
-    # Save to DB
+    # Save to DB, tagged with the class data it was generated from
     cursor = mysql.connection.cursor()
     cursor.execute("""
-        INSERT INTO insights (teacher_id, subject, key_findings, recommendations)
-        VALUES (%s, %s, %s, %s)
+        INSERT INTO insights (teacher_id, subject, key_findings, recommendations, data_version)
+        VALUES (%s, %s, %s, %s, %s)
     """, (
         teacher_id,
         subject,
         json.dumps(cleaned_findings),
-        json.dumps(cleaned_recommendations)
+        json.dumps(cleaned_recommendations),
+        data_version
     ))
     mysql.connection.commit()
     cursor.close()
 
-    return jsonify({
+    return {
         "key_findings": cleaned_findings,
-        "recommendations": cleaned_recommendations
-    })
+        "recommendations": cleaned_recommendations,
+        "last_updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "data_version": data_version,
+        "stale": False
+    }
+
+def wants_force():
+    data = request.get_json(silent=True) or {}
+    flag = str(request.args.get('force') or data.get('force') or '')
+    return flag.lower() in ('1', 'true', 'yes')
+
+def current_key_findings(teacher_id, subject):
+    # (data_version, stored row or None); the row is reusable unless forced or stale
+    data_version = class_data_version(teacher_id, subject)
+    row = latest_insights(teacher_id, subject)
+    return data_version, row
+
+@app.route('/generate-key-findings', methods=['POST'])
+@jwt_required()
+def generate_key_findings():
+    payload, error = read_key_findings_request()
+    if error:
+        return error
+    class_profile, teacher_id, subject = payload
+
+    # Class data unchanged since the stored copy: serve it instead of regenerating
+    data_version, row = current_key_findings(teacher_id, subject)
+    if row and row['data_version'] == data_version and not wants_force():
+        return jsonify(insights_payload(row, data_version))
+
+    # Free the pooled connection during the model call
+    mysql.release()
+
+    try:
+        content = llm.complete(key_findings_prompt(class_profile), max_tokens=500)
+    except LLMError as e:
+        # Provider down or over quota: an older copy (flagged stale) beats an error
+        if not row:
+            raise
+        print("Serving stale key findings:", e)
+        return jsonify(insights_payload(row, data_version))
+
+    return jsonify(save_key_findings(teacher_id, subject, content, data_version))
+
+# Streaming variant: "token" events while generating, then "done" once the result is saved
+@app.route('/generate-key-findings/stream', methods=['POST'])
+@jwt_required()
+def generate_key_findings_stream():
+    payload, error = read_key_findings_request()
+    if error:
+        return error
+    class_profile, teacher_id, subject = payload
+
+    data_version, row = current_key_findings(teacher_id, subject)
+    if row and row['data_version'] == data_version and not wants_force():
+        return Response(sse_event("done", insights_payload(row, data_version)), mimetype="text/event-stream")
+
+    return stream_completion(
+        key_findings_prompt(class_profile),
+        500,
+        lambda content: save_key_findings(teacher_id, subject, content, data_version),
+        "AI failed to generate key findings."
+    )
 
 
 # User Class
@@ -1142,6 +1427,7 @@ def load_user(user_id):
     cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
     cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
     user = cursor.fetchone()
+    cursor.close()
     if user:
         return User(user["id"], user["name"], user["email"], user["password"])
     return None
@@ -1163,11 +1449,14 @@ def register():
     cursor = mysql.connection.cursor()
     cursor.execute("SELECT * FROM users WHERE email=%s", (email,))
     if cursor.fetchone():
+        cursor.close()
         return jsonify({'error': 'User already exists'}), 409
 
     hashed_pw = bcrypt.generate_password_hash(password).decode('utf-8')
     cursor.execute("INSERT INTO users (name, email, password, role) VALUES (%s, %s, %s, %s)",
                    (name, email, hashed_pw, role))
+    if role == 'teacher':
+        bump_stats(cursor, total_teachers=1)
     mysql.connection.commit()
     cursor.close()
 
@@ -1231,6 +1520,7 @@ def db_test():
         cursor = mysql.connection.cursor()
         cursor.execute("SELECT DATABASE();")
         result = cursor.fetchone()
+        cursor.close()
         return jsonify({"message": f"✅ Connected to database: {result[0]}"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1324,7 +1614,7 @@ def get_all_users():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# Admin Dashboard Stats
+# Admin Dashboard Stats (one-row snapshot kept up to date by the write paths)
 @app.route('/admin/stats', methods=['GET'])
 @jwt_required()
 def get_admin_stats():
@@ -1332,44 +1622,57 @@ def get_admin_stats():
     if identity["role"] != "admin":
         return jsonify({'error': 'Access denied'}), 403
 
-    cursor = mysql.connection.cursor()
-
-    # 1. Total students in student_subjects
-    cursor.execute("SELECT COUNT(DISTINCT student_id) FROM student_subjects")
-    total_students = cursor.fetchone()[0]
+    stats = get_stats(mysql.connection)
 
-    # 2. Profiles completed this term (assuming current AY is 2024–2025)
-    cursor.execute("""
-        SELECT COUNT(*) FROM student_profiles
-        WHERE created_at >= STR_TO_DATE('2024-06-01', '%Y-%m-%d')
-    """)
-    completed_this_term = cursor.fetchone()[0]
+    # Drift correction in the background once the snapshot is old enough
+    max_age = app.config['ADMIN_STATS_RECONCILE_SECONDS']
+    if max_age and stats["age_seconds"] > max_age:
+        schedule_stats_reconcile(identity["id"])
 
-    # 3. Survey files uploaded
-    cursor.execute("SELECT COUNT(*) FROM uploaded_files")
-    total_files_uploaded = cursor.fetchone()[0]
+    last_upload = stats["last_upload"]
 
-    # 4. Active teachers who uploaded at least 1 file
-    cursor.execute("""
-        SELECT COUNT(DISTINCT user_id)
-        FROM uploaded_files
-    """)
-    active_teachers = cursor.fetchone()[0]
-
-    # 5. Last upload timestamp
-    cursor.execute("SELECT MAX(date_uploaded) FROM uploaded_files")
-    last_upload = cursor.fetchone()[0]
-    last_upload_str = last_upload.strftime('%Y-%m-%d %H:%M:%S') if last_upload else "No uploads yet"
+    return jsonify({
+        "total_students": stats["total_students"],
+        "profiles_completed": stats["profiles_completed"],
+        "files_uploaded": stats["files_uploaded"],
+        "active_teachers": stats["active_teachers"],
+        "last_upload": last_upload.strftime('%Y-%m-%d %H:%M:%S') if last_upload else "No uploads yet",
+        "total_teachers": stats["total_teachers"],
+        "reconciled_at": stats["reconciled_at"].strftime('%Y-%m-%d %H:%M:%S')
+    }), 200
 
-    cursor.close()
+# Recount the admin stats snapshot from the base tables
+def run_stats_reconcile(job):
+    with app.app_context():
+        result = reconcile_stats(mysql.connection)
+    if result["last_upload"]:
+        result["last_upload"] = result["last_upload"].strftime('%Y-%m-%d %H:%M:%S')
+    return result
+
+stats_reconcile_lock = threading.Lock()
+stats_reconcile_job = None
+
+def schedule_stats_reconcile(owner_id):
+    # At most one reconciliation queued or running per process
+    global stats_reconcile_job
+    with stats_reconcile_lock:
+        if stats_reconcile_job is None or stats_reconcile_job.status not in ("queued", "running"):
+            stats_reconcile_job = jobs.submit("stats", owner_id, run_stats_reconcile)
+        return stats_reconcile_job
+
+@app.route('/admin/stats/reconcile', methods=['POST'])
+@jwt_required()
+def reconcile_admin_stats():
+    identity = json.loads(get_jwt_identity())
+    if identity["role"] != "admin":
+        return jsonify({'error': 'Access denied'}), 403
 
+    job = schedule_stats_reconcile(identity["id"])
     return jsonify({
-        "total_students": total_students,
-        "profiles_completed": completed_this_term,
-        "files_uploaded": total_files_uploaded,
-        "active_teachers": active_teachers,
-        "last_upload": last_upload_str
-    }), 200
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}"
+    }), 202
 
 
 # Admin Dashboard - Trait Distribution
@@ -1394,7 +1697,77 @@ def get_trait_distribution():
     data = [{"trait": row[0], "count": row[1]} for row in results]
     return jsonify(data), 200
 
-# Admin Dashboard - Student Profie List
+# Admin Dashboard - AI response cache hit/miss counters
+@app.route('/admin/ai-cache', methods=['GET'])
+@jwt_required()
+def get_ai_cache_stats():
+    identity = json.loads(get_jwt_identity())
+    if identity["role"] != "admin":
+        return jsonify({"error": "Access denied"}), 403
+
+    return jsonify(dict(llm_cache.stats(), in_process=inflight.stats())), 200
+
+# Admin Dashboard - MySQL pool size, saturation, checkout wait and leaked cursors
+@app.route('/admin/db-pool', methods=['GET'])
+@jwt_required()
+def get_db_pool_stats():
+    identity = json.loads(get_jwt_identity())
+    if identity["role"] != "admin":
+        return jsonify({"error": "Access denied"}), 403
+
+    return jsonify(mysql.pool.stats()), 200
+
+# Admin Dashboard - LLM token usage, latency and failures per teacher and endpoint
+@app.route('/admin/llm-usage', methods=['GET'])
+@jwt_required()
+def get_llm_usage():
+    identity = json.loads(get_jwt_identity())
+    if identity["role"] != "admin":
+        return jsonify({"error": "Access denied"}), 403
+
+    days = request.args.get("days", default=30, type=int)
+    rows = usage_ledger.report(days)
+
+    # Attach teacher names for the report
+    teacher_ids = sorted({row["teacher_id"] for row in rows if row["teacher_id"].isdigit()})
+    names = {}
+    if teacher_ids:
+        cursor = mysql.connection.cursor()
+        cursor.execute(
+            f"SELECT id, name FROM users WHERE id IN ({','.join(['%s'] * len(teacher_ids))})",
+            tuple(teacher_ids)
+        )
+        names = {str(user_id): name for user_id, name in cursor.fetchall()}
+        cursor.close()
+
+    totals = {"calls": 0, "failures": 0, "rejected": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    for row in rows:
+        row["teacher_name"] = names.get(row["teacher_id"])
+        for key in totals:
+            totals[key] += row[key]
+
+    return jsonify({
+        "days": days,
+        "limits": {
+            "calls_per_minute": usage_guard.calls_per_minute,
+            "burst": usage_guard.burst,
+            "daily_token_quota": usage_guard.daily_token_quota
+        },
+        "totals": totals,
+        "usage": rows
+    }), 200
+
+# Admin Dashboard - LLM provider and circuit breaker state
+@app.route('/admin/ai-provider', methods=['GET'])
+@jwt_required()
+def get_ai_provider_status():
+    identity = json.loads(get_jwt_identity())
+    if identity["role"] != "admin":
+        return jsonify({"error": "Access denied"}), 403
+
+    return jsonify(llm.status()), 200
+
+# Admin Dashboard - Student Profie List (keyset-paginated, newest first)
 @app.route('/admin/student-profiles', methods=['GET'])
 @jwt_required()
 def get_all_student_profiles():
@@ -1402,13 +1775,26 @@ def get_all_student_profiles():
     if identity["role"] != "admin":
         return jsonify({"error": "Access denied"}), 403
 
+    limit = min(max(request.args.get("limit", default=50, type=int), 1), 500)
+    filters = profile_filters(request.args)
+    search = request.args.get("q", "").strip() or None
+    try:
+        after = decode_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+
     cursor = mysql.connection.cursor()
-    cursor.execute("""
-        SELECT student_id, name, dominant_trait, academic_year, year_level, created_at
-        FROM student_profiles
-        ORDER BY created_at DESC
-    """)
+    cursor.execute(*profile_page_query(filters, after, limit, search))
     results = cursor.fetchall()
+
+    has_more = len(results) > limit
+    results = results[:limit]
+
+    # A complete first page is its own exact count
+    if after is None and not has_more:
+        total, exact = len(results), True
+    else:
+        total, exact = estimate_profile_count(cursor, filters, search), False
     cursor.close()
 
     data = [
@@ -1423,7 +1809,50 @@ def get_all_student_profiles():
         for row in results
     ]
 
-    return jsonify(data), 200
+    return jsonify({
+        "profiles": data,
+        "next_cursor": encode_cursor(results[-1][5], results[-1][0]) if has_more else None,
+        "total_estimate": total,
+        "total_is_exact": exact
+    }), 200
+
+# Admin Export - stream student_profiles / student_subjects as NDJSON or CSV
+@app.route('/admin/export/<name>', methods=['GET'])
+@jwt_required()
+def export_table(name):
+    identity = json.loads(get_jwt_identity())
+    if identity["role"] != "admin":
+        return jsonify({"error": "Access denied"}), 403
+
+    fmt = request.args.get("format", "ndjson").lower()
+    if name not in EXPORTS or fmt not in FORMATS:
+        return jsonify({"error": "Unknown export or format"}), 404
+
+    columns, sql, params = export_query(name, request.args)
+
+    def generate():
+        # A slow client stalls the server-side cursor: allow it more time per
+        # write, and put the pooled connection's setting back afterwards
+        cursor = mysql.connection.cursor()
+        cursor.execute("SET SESSION net_write_timeout = %s", (app.config['EXPORT_NET_WRITE_TIMEOUT'],))
+        rows = mysql.connection.cursor(MySQLdb.cursors.SSCursor)
+        try:
+            yield from stream_rows(rows, columns, sql, params, fmt, app.config['EXPORT_BATCH_SIZE'])
+        finally:
+            rows.close()
+            cursor.execute("SET SESSION net_write_timeout = DEFAULT")
+            cursor.close()
+
+    # No Content-Length: sent with chunked transfer encoding as rows are read
+    return Response(
+        stream_with_context(generate()),
+        mimetype=FORMATS[fmt],
+        headers={
+            "Content-Disposition": f"attachment; filename={name}.{fmt}",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
 
 @app.route('/admin/student/<student_id>', methods=['PUT'])
 @jwt_required()
@@ -1461,7 +1890,11 @@ def delete_student_profile(student_id):
 
     try:
         cursor = mysql.connection.cursor()
+        affected_teachers = teachers_for_student(cursor, student_id)
+        completed = completed_profiles(cursor, student_id)
         cursor.execute("DELETE FROM student_profiles WHERE student_id = %s", (student_id,))
+        refresh_teachers(cursor, affected_teachers)
+        bump_stats(cursor, profiles_completed=-completed)
         mysql.connection.commit()
         cursor.close()
         return jsonify({"message": "Student profile deleted successfully"}), 200
@@ -1483,157 +1916,15 @@ def upload_psychometric_file():
     if not file or not academic_year:
         return jsonify({"error": "Missing file or metadata."}), 400
 
-    try:
-        df = pd.read_csv(file)
-
-        # File validation check
-        expected_columns = [f"Answer_{i+1}" for i in range(50)] + ["STUDENT ID", "STUDENT NAME", "YEAR LEVEL"]
-        for col in expected_columns:
-            if col not in df.columns:
-                return jsonify({"error": f"Missing column: {col}"}), 400
-
-        # Algorithm Setup
-        assessment = [
-            {"number": 1, "type": 2, "math": "-"},
-            {"number": 2, "type": 5, "math": "+"},
-            {"number": 3, "type": 1, "math": "-"},
-            {"number": 4, "type": 3, "math": "+"},
-            {"number": 5, "type": 4, "math": "+"},
-            {"number": 6, "type": 2, "math": "+"},
-            {"number": 7, "type": 5, "math": "-"},
-            {"number": 8, "type": 1, "math": "+"},
-            {"number": 9, "type": 3, "math": "-"},
-            {"number": 10, "type": 4, "math": "-"},
-            {"number": 11, "type": 2, "math": "-"},
-            {"number": 12, "type": 5, "math": "+"},
-            {"number": 13, "type": 1, "math": "-"},
-            {"number": 14, "type": 3, "math": "+"},
-            {"number": 15, "type": 4, "math": "+"},
-            {"number": 16, "type": 2, "math": "+"},
-            {"number": 17, "type": 5, "math": "-"},
-            {"number": 18, "type": 1, "math": "+"},
-            {"number": 19, "type": 3, "math": "-"},
-            {"number": 20, "type": 4, "math": "-"},
-            {"number": 21, "type": 2, "math": "-"},
-            {"number": 22, "type": 5, "math": "+"},
-            {"number": 23, "type": 1, "math": "-"},
-            {"number": 24, "type": 3, "math": "+"},
-            {"number": 25, "type": 4, "math": "+"},
-            {"number": 26, "type": 2, "math": "+"},
-            {"number": 27, "type": 5, "math": "-"},
-            {"number": 28, "type": 1, "math": "+"},
-            {"number": 29, "type": 3, "math": "-"},
-            {"number": 30, "type": 4, "math": "-"},
-            {"number": 31, "type": 2, "math": "-"},
-            {"number": 32, "type": 5, "math": "+"},
-            {"number": 33, "type": 1, "math": "-"},
-            {"number": 34, "type": 3, "math": "+"},
-            {"number": 35, "type": 4, "math": "+"},
-            {"number": 36, "type": 2, "math": "+"},
-            {"number": 37, "type": 5, "math": "-"},
-            {"number": 38, "type": 1, "math": "+"},
-            {"number": 39, "type": 3, "math": "-"},
-            {"number": 40, "type": 4, "math": "-"},
-            {"number": 41, "type": 2, "math": "-"},
-            {"number": 42, "type": 5, "math": "+"},
-            {"number": 43, "type": 1, "math": "-"},
-            {"number": 44, "type": 3, "math": "+"},
-            {"number": 45, "type": 4, "math": "+"},
-            {"number": 46, "type": 2, "math": "+"},
-            {"number": 47, "type": 5, "math": "-"},
-            {"number": 48, "type": 1, "math": "+"},
-            {"number": 49, "type": 3, "math": "-"},
-            {"number": 50, "type": 4, "math": "-"}
-        ]
-
-        trait_map = {
-            1: "Extraversion",
-            2: "Neuroticism",
-            3: "Agreeableness",
-            4: "Conscientiousness",
-            5: "Openness"
-        }
-        inserted_count = 0
-        skipped_count = 0
-
-        cursor = mysql.connection.cursor()
-
-        skipped_students = []
-
-        for _, row in df.iterrows():
-            student_id = str(row["STUDENT ID"]).strip()
-            name = str(row["STUDENT NAME"]).strip()
-            year_level = str(row["YEAR LEVEL"]).strip()
-
-            # Skip if student profile already exists
-            cursor.execute("SELECT 1 FROM student_profiles WHERE student_id = %s AND academic_year = %s", (student_id, academic_year))
-            if cursor.fetchone():
-                skipped_count += 1
-                skipped_students.append(student_id)
-                continue
-
-            trait_scores = {trait: [] for trait in trait_map.values()}
-            max_score = 0
-            dominant_traits = []
-
-            for i, item in enumerate(assessment):
-                answer = int(row.get(f"Answer_{i+1}", 0))
-                if item["math"] == "-":
-                    if answer == 1:
-                        score = 5
-                    elif answer == 2:
-                        score = 4
-                    elif answer == 3:
-                        score = 3
-                    elif answer == 4:
-                        score = 2
-                    elif answer == 5:
-                        score = 1
-                    else:
-                        score = 0  # fallback for invalid response
-                else:
-                    score = answer
-
-                trait = trait_map[item["type"]]
-                trait_scores[trait].append(score)
-
-            scores_total = {k: sum(v) for k, v in trait_scores.items()}
-
-            for trait, score in scores_total.items():
-                if score > max_score:
-                    max_score = score
-                    dominant_traits = [trait]
-                elif score == max_score:
-                    dominant_traits.append(trait)
-
-            dominant = " & ".join(dominant_traits)
-
-            # Insert into student_profiles
-            cursor.execute("""
-                INSERT INTO student_profiles (
-                    student_id, name, trait_scores, dominant_trait,
-                    academic_year, year_level
-                )
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (
-                student_id,
-                name,
-                json.dumps(scores_total),
-                dominant,
-                academic_year,
-                year_level
-            ))
-            inserted_count += 1
+    if wants_async():
+        return enqueue_ingest("psychometric", identity["id"], file, ingest_psychometric, academic_year)
 
-        mysql.connection.commit()
-        cursor.close()
+    try:
+        result = ingest_psychometric(mysql.connection, file, academic_year, app.config['INGEST_CHUNK_SIZE'])
+        return jsonify(result)
 
-        return jsonify({
-            "message": f"Upload complete.",
-            "inserted": inserted_count,
-            "skipped": skipped_count,
-            "skipped_students": skipped_students
-        })
+    except CSVFormatError as e:
+        return jsonify({"error": str(e)}), 400
 
     except Exception as e:
         print("Error uploading psychometric file:", e)
@@ -0,0 +1,132 @@
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+
+from llm import create_llm_client
+
+# Micro-benchmark: per-request OpenAI client (what individual insights used
+# to do) vs. the shared pooled LLM client, against a local mock
+# OpenAI-compatible server so no network or API key is needed:
+#   python bench_llm_client.py [requests] [concurrency] [server_latency_ms]
+# Reports client startup cost, per-request latency and how many TCP
+# connections the server had to accept.
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+SERVER_LATENCY = (float(sys.argv[3]) if len(sys.argv) > 3 else 5) / 1000
+
+PROMPT = "Based on the class-wide dominant personality trait: Openness, provide general study recommendations."
+
+REPLY = json.dumps({
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "bench",
+    "choices": [{
+        "index": 0,
+        "message": {"role": "assistant", "content": "Student Recommendation: ...\nTeacher Strategy: ..."},
+        "finish_reason": "stop"
+    }],
+    "usage": {"prompt_tokens": 20, "completion_tokens": 10, "total_tokens": 30}
+}).encode("utf-8")
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(SERVER_LATENCY)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(REPLY)))
+        self.end_headers()
+        self.wfile.write(REPLY)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def per_request_client(base_url):
+    startup = []
+
+    def call():
+        started = time.perf_counter()
+        client = openai.OpenAI(api_key="bench", base_url=base_url)
+        startup.append(time.perf_counter() - started)
+        client.chat.completions.create(
+            model="bench",
+            messages=[{"role": "user", "content": PROMPT}],
+            max_tokens=300
+        )
+        client.close()
+
+    return call, startup
+
+
+def shared_client(base_url):
+    started = time.perf_counter()
+    llm = create_llm_client({"LLM_PROVIDER": "local", "LLM_BASE_URL": base_url, "LLM_MODEL": "bench"})
+    startup = [time.perf_counter() - started]
+
+    def call():
+        llm.complete(PROMPT)
+
+    return call, startup
+
+
+def run(name, make_call, server, base_url):
+    call, startup = make_call(base_url)
+    call()  # warm-up
+
+    with server.lock:
+        server.connections = 0
+
+    def timed(_):
+        started = time.perf_counter()
+        call()
+        return time.perf_counter() - started
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        latencies = sorted(pool.map(timed, range(REQUESTS)))
+    elapsed = time.perf_counter() - began
+
+    print(
+        f"{name:<22} startup {statistics.mean(startup) * 1000:7.2f} ms"
+        f"  mean {statistics.mean(latencies) * 1000:7.2f} ms"
+        f"  p50 {latencies[len(latencies) // 2] * 1000:7.2f} ms"
+        f"  p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.2f} ms"
+        f"  {REQUESTS / elapsed:8.1f} req/s"
+        f"  connections {server.connections}"
+    )
+
+
+if __name__ == "__main__":
+    server = start_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    print(f"{REQUESTS} requests, concurrency {CONCURRENCY}, mock latency {SERVER_LATENCY * 1000:.0f} ms")
+
+    run("per-request client", per_request_client, server, base_url)
+    run("shared pooled client", shared_client, server, base_url)
+    server.shutdown()
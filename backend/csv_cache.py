@@ -0,0 +1,60 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from scoring import answers_from_records, score_answers, dominant_traits
+
+
+class ParsedAssessment:
+    def __init__(self, students, skipped=()):
+        self.students = students
+        # Rows left out by the parser: [{"row", "student_id", "reason"}]
+        self.skipped = list(skipped)
+        self.totals = score_answers(answers_from_records(students))
+        self.dominants = dominant_traits(self.totals)
+        self.index = {str(student.get("STUDENT ID")): i for i, student in enumerate(students)}
+        # Data version of this upload: identical scores give the same version
+        self.version = hashlib.sha1(self.totals.tobytes()).hexdigest()[:16]
+
+    def find(self, student_id):
+        i = self.index.get(str(student_id))
+        return None if i is None else (self.students[i], self.totals[i], self.dominants[i])
+
+
+class AssessmentCache:
+    # Parsed + scored copy of each user's latest CSV, keyed on path and
+    # validated against the file's mtime/size so a changed file is re-read.
+    # `parse(file_path)` returns (students, skipped rows) and raises on a file
+    # it can't read, so nothing is scored or cached for it.
+
+    def __init__(self, parse, max_entries=64):
+        self._parse = parse
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+
+    def load(self, file_path):
+        stat = os.stat(file_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._entries.get(file_path)
+            if cached and cached[0] == signature:
+                self._entries.move_to_end(file_path)
+                return cached[1]
+
+        students, skipped = self._parse(file_path)
+        parsed = ParsedAssessment(students, skipped)
+
+        with self._lock:
+            self._entries[file_path] = (signature, parsed)
+            self._entries.move_to_end(file_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return parsed
+
+    def invalidate(self, file_path):
+        with self._lock:
+            self._entries.pop(file_path, None)
@@ -0,0 +1,344 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+import MySQLdb
+from flask import current_app, g, has_request_context, request
+
+
+class PoolTimeout(Exception):
+    # No connection became free within the checkout timeout
+    pass
+
+
+class _Entry:
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.returned_at = self.created_at
+
+
+class ConnectionPool:
+    # Bounded pool of MySQL connections shared by every request/job thread of
+    # this process. Up to `max_size` connections are open at once; a checkout
+    # waits at most `timeout` seconds for one to free up. Connections older than
+    # `recycle` seconds are replaced, idle ones are pinged before reuse
+    # (`pre_ping`), and idle connections beyond `min_size` are closed after
+    # `idle_timeout` seconds.
+
+    def __init__(self, connect, min_size=2, max_size=10, timeout=5, recycle=3600, pre_ping=True, idle_timeout=300):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.idle_timeout = idle_timeout
+
+        self._idle = deque()
+        self._size = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self._pid = os.getpid()
+
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.recycled = 0
+        self.ping_failures = 0
+        self.leaked_cursors = 0
+
+    def _open(self):
+        conn = self._connect()
+        with self._cond:
+            self.created += 1
+        return _Entry(conn)
+
+    @staticmethod
+    def _close(entry):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def _check_pid(self):
+        # Connections opened before a fork belong to the parent; start over
+        if self._pid != os.getpid():
+            self._idle.clear()
+            self._size = 0
+            self._pid = os.getpid()
+
+    def _prune_idle(self):
+        # Oldest idle connections sit at the left; keep min_size open
+        now = time.monotonic()
+        stale = []
+        while (self._idle and self._size > self.min_size
+               and now - self._idle[0].returned_at > self.idle_timeout):
+            stale.append(self._idle.popleft())
+            self._size -= 1
+        return stale
+
+    def fill(self):
+        # Open connections up to min_size (e.g. at startup)
+        while True:
+            with self._cond:
+                self._check_pid()
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                entry = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            self.release(entry)
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        with self._cond:
+            self._check_pid()
+            stale = self._prune_idle()
+            while True:
+                if self._idle:
+                    # Most recently returned first: keeps a warm working set
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    entry = None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection available within {self.timeout}s "
+                        f"({self._size}/{self.max_size} in use)"
+                    )
+                waited = True
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            wait_ms = (time.monotonic() - started) * 1000
+            self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+            if waited:
+                self.waits += 1
+
+        for old in stale:
+            self._close(old)
+
+        try:
+            return self._prepare(entry)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _prepare(self, entry):
+        if entry is None:
+            return self._open()
+
+        if self.recycle and time.monotonic() - entry.created_at > self.recycle:
+            with self._cond:
+                self.recycled += 1
+            self._close(entry)
+            return self._open()
+
+        if self.pre_ping:
+            try:
+                entry.conn.ping()
+            except Exception:
+                with self._cond:
+                    self.ping_failures += 1
+                self._close(entry)
+                return self._open()
+
+        return entry
+
+    def release(self, entry, discard=False):
+        with self._cond:
+            if self._pid != os.getpid():
+                # Checked out before a fork; not ours to reuse
+                return
+            if discard:
+                self._size -= 1
+            else:
+                entry.returned_at = time.monotonic()
+                self._idle.append(entry)
+            self._cond.notify()
+        if discard:
+            self._close(entry)
+
+    def record_leaks(self, count):
+        with self._cond:
+            self.leaked_cursors += count
+
+    def stats(self):
+        with self._cond:
+            in_use = self._size - len(self._idle)
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": in_use,
+                "waiting": self._waiting,
+                "saturation": round(in_use / self.max_size, 3),
+                "checkouts": self.checkouts,
+                "waited_checkouts": self.waits,
+                "wait_ms_avg": round(self.wait_ms_total / self.checkouts, 2) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_ms_max, 2),
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "recycled": self.recycled,
+                "ping_failures": self.ping_failures,
+                "leaked_cursors": self.leaked_cursors
+            }
+
+
+class TrackedCursor:
+    # Cursor wrapper that remembers where it was opened, so cursors still open
+    # when the connection goes back to the pool can be reported and closed
+    def __init__(self, cursor, opened_at):
+        self._cursor = cursor
+        self.opened_at = opened_at
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PooledConnection:
+    # The connection handed out for one app context
+    def __init__(self, entry, owner):
+        self._entry = entry
+        self.owner = owner
+        self._cursors = []
+
+    def cursor(self, *args, **kwargs):
+        caller = sys._getframe(1)
+        cursor = TrackedCursor(
+            self._entry.conn.cursor(*args, **kwargs),
+            f"{os.path.basename(caller.f_code.co_filename)}:{caller.f_lineno}"
+        )
+        self._cursors.append(cursor)
+        return cursor
+
+    def open_cursors(self):
+        return [cursor for cursor in self._cursors if not cursor.closed]
+
+    def __getattr__(self, name):
+        return getattr(self._entry.conn, name)
+
+
+class PooledMySQL:
+    # Drop-in for flask_mysqldb.MySQL: `mysql.connection` checks a connection
+    # out of the pool once per app context (request or job) and returns it at
+    # teardown, rolling back anything left uncommitted. Settings come from
+    # MYSQL_* / MYSQL_POOL_* in app.config.
+
+    def __init__(self, app=None):
+        self.pool = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        connect_kwargs = {
+            "host": config.get("MYSQL_HOST", "localhost"),
+            "port": int(config.get("MYSQL_PORT", 3306)),
+            "user": config.get("MYSQL_USER", "root"),
+            "passwd": config.get("MYSQL_PASSWORD", ""),
+            "db": config.get("MYSQL_DB"),
+            "charset": config.get("MYSQL_CHARSET", "utf8"),
+            "connect_timeout": int(config.get("MYSQL_CONNECT_TIMEOUT", 10))
+        }
+        connect_kwargs = {key: value for key, value in connect_kwargs.items() if value is not None}
+
+        self.pool = ConnectionPool(
+            lambda: MySQLdb.connect(**connect_kwargs),
+            min_size=int(config.get("MYSQL_POOL_MIN_SIZE", 2)),
+            max_size=int(config.get("MYSQL_POOL_MAX_SIZE", 10)),
+            timeout=float(config.get("MYSQL_POOL_TIMEOUT", 5)),
+            recycle=float(config.get("MYSQL_POOL_RECYCLE", 3600)),
+            pre_ping=bool(config.get("MYSQL_POOL_PRE_PING", True)),
+            idle_timeout=float(config.get("MYSQL_POOL_IDLE_TIMEOUT", 300))
+        )
+        app.extensions["pooled_mysql"] = self
+        app.teardown_appcontext(self.teardown)
+
+        try:
+            self.pool.fill()
+        except Exception as e:
+            # Not fatal: connections are opened on first use once MySQL is up
+            print("Could not pre-open MySQL connections:", e)
+
+    @property
+    def connection(self):
+        conn = g.get("_pooled_mysql")
+        if conn is None:
+            owner = request.endpoint if has_request_context() else "background job"
+            conn = g._pooled_mysql = PooledConnection(self.pool.acquire(), owner)
+        return conn
+
+    def release(self):
+        # Hand this context's connection back to the pool now, e.g. before a
+        # slow model call or a long response stream. Uncommitted work is rolled
+        # back; the next `connection` access checks out a fresh one.
+        self.teardown(None)
+
+    def teardown(self, exception):
+        conn = g.pop("_pooled_mysql", None)
+        if conn is None:
+            return
+
+        leaked = conn.open_cursors()
+        if leaked:
+            current_app.logger.warning(
+                "%d unclosed cursor(s) in %s, opened at %s",
+                len(leaked), conn.owner, ", ".join(cursor.opened_at for cursor in leaked)
+            )
+            self.pool.record_leaks(len(leaked))
+            for cursor in leaked:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+
+        try:
+            conn.rollback()
+        except Exception as e:
+            # Broken connection: drop it rather than hand it to the next request
+            print("Discarding pooled MySQL connection:", e)
+            self.pool.release(conn._entry, discard=True)
+            return
+        self.pool.release(conn._entry)
@@ -0,0 +1,73 @@
+import sys
+
+import MySQLdb.cursors
+
+from app import app, mysql, student_list_query
+from aggregates import new_profiles_query, refresh_queries, teacher_aggregates_query
+from profiles import profile_page_query
+
+# Query-plan regression check for the roster/dashboard hot paths.
+# Run against a database loaded with production-sized data:
+#   python explain_hot_queries.py [max_scan_rows]
+# Fails if any plan fully scans (type=ALL) a base table of more than max_scan_rows rows.
+
+MAX_SCAN_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+
+def sample_keys(cursor):
+    cursor.execute("""
+        SELECT teacher_id, subject, COUNT(*) AS n
+        FROM student_subjects
+        GROUP BY teacher_id, subject
+        ORDER BY n DESC
+        LIMIT 1
+    """)
+    row = cursor.fetchone()
+    if not row:
+        sys.exit("student_subjects is empty; load data before checking plans.")
+
+    cursor.execute("SELECT academic_year, MIN(created_at) AS since FROM student_profiles GROUP BY academic_year LIMIT 1")
+    profile = cursor.fetchone()
+    if not profile:
+        sys.exit("student_profiles is empty; load data before checking plans.")
+    return row["teacher_id"], row["subject"], profile["academic_year"], profile["since"]
+
+
+def hot_queries(teacher_id, subject, academic_year, since):
+    yield "student list (all subjects)", *student_list_query(teacher_id)
+    yield "student list (one subject)", *student_list_query(teacher_id, subject)
+    yield "dashboard aggregates", *teacher_aggregates_query(teacher_id)
+    yield "new profile teachers", *new_profiles_query(academic_year, since)
+    yield "admin profile listing", *profile_page_query({})
+    yield "admin profile listing (year, next page)", *profile_page_query({"academic_year": academic_year}, (since, ""))
+    for level, (sql, params) in enumerate(refresh_queries([teacher_id])):
+        yield f"aggregate refresh level {level}", sql, params
+
+
+def main():
+    failures = []
+
+    with app.app_context():
+        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        keys = sample_keys(cursor)
+
+        for name, sql, params in hot_queries(*keys):
+            cursor.execute("EXPLAIN " + sql, params)
+            for step in cursor.fetchall():
+                # <derivedN>/<subqueryN> are our own materialized results, only base tables count
+                base_table = not (step["table"] or "").startswith("<")
+                full_scan = base_table and step["type"] == "ALL" and (step["rows"] or 0) > MAX_SCAN_ROWS
+                print(f"{'FAIL' if full_scan else 'ok  '} {name}: {step['table']} type={step['type']} key={step['key']} rows={step['rows']}")
+                if full_scan:
+                    failures.append((name, step["table"]))
+
+        cursor.close()
+
+    if failures:
+        print(f"\n{len(failures)} full scan(s) over {MAX_SCAN_ROWS} rows:", failures)
+        sys.exit(1)
+    print("\nNo full scans on hot queries.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from scoring import TRAIT_COLUMNS
+
+
+# name -> (table, exported columns, filters accepted from the query string)
+EXPORTS = {
+    "student-profiles": (
+        "student_profiles",
+        ["student_id", "name", "dominant_trait", "academic_year", "year_level", "created_at"] + TRAIT_COLUMNS,
+        ["academic_year", "year_level", "dominant_trait"]
+    ),
+    "student-subjects": (
+        "student_subjects",
+        ["student_id", "teacher_id", "subject", "academic_year", "year_level"],
+        ["teacher_id", "subject", "academic_year"]
+    ),
+}
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def export_query(name, args):
+    table, columns, filters = EXPORTS[name]
+    used = [column for column in filters if args.get(column) and args.get(column) != "All"]
+    where = " AND ".join(f"{column} = %s" for column in used)
+    # Primary key order: a plain index walk the server can stream from
+    sql = f"SELECT {', '.join(columns)} FROM {table} {'WHERE ' + where if where else ''} ORDER BY id"
+    return columns, sql, tuple(args[column] for column in used)
+
+
+def _value(value):
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d %H:%M:%S" if isinstance(value, datetime) else "%Y-%m-%d")
+    return value
+
+
+def stream_rows(cursor, columns, sql, params, fmt, batch_size=1000):
+    # Yields the export as text chunks of up to `batch_size` rows. `cursor`
+    # should be unbuffered (SSCursor) so rows come off the wire as they are
+    # read and memory stays flat whatever the table size.
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        # Header goes out before the query runs: the client sees bytes at once
+        yield buffer.getvalue()
+
+    cursor.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        if fmt == "csv":
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([[_value(value) for value in row] for row in rows])
+            yield buffer.getvalue()
+        else:
+            yield "".join(
+                json.dumps(dict(zip(columns, (_value(value) for value in row)))) + "\n"
+                for row in rows
+            )
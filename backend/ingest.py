@@ -0,0 +1,245 @@
+import json
+import unicodedata
+
+import pandas as pd
+
+from scoring import answers_from_frame, score_answers, dominant_traits, scores_to_dict
+from aggregates import lock_teachers, refresh_teachers, teachers_for_new_profiles
+from admin_stats import bump_stats, lock_stats, new_roster_students_query
+
+
+ANSWER_COLUMNS = [f"Answer_{i+1}" for i in range(50)]
+PSYCHOMETRIC_COLUMNS = ANSWER_COLUMNS + ["STUDENT ID", "STUDENT NAME", "YEAR LEVEL"]
+
+
+class CSVFormatError(Exception):
+    pass
+
+
+def check_header(file, required):
+    # Validate the header up front, so a file with no data rows is still
+    # rejected for missing columns; rewinds the file for the chunked read
+    try:
+        columns = set(pd.read_csv(file, nrows=0).columns)
+    except pd.errors.EmptyDataError:
+        raise CSVFormatError("The CSV file is empty.")
+    file.seek(0)
+
+    for col in required:
+        if col not in columns:
+            raise CSVFormatError(f"Missing column: {col}")
+
+
+INSERT_PROFILE_SQL = """
+    INSERT INTO student_profiles (
+        student_id, name, trait_scores,
+        extraversion, neuroticism, agreeableness, conscientiousness, openness,
+        dominant_trait, academic_year, year_level
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE student_id = student_id
+"""
+
+
+def student_key(student_id):
+    # Student IDs compare like the utf8mb4_0900_ai_ci column: case- and accent-insensitive
+    decomposed = unicodedata.normalize("NFKD", student_id.strip())
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def ingest_psychometric(connection, file, academic_year, chunk_size=1000, progress=None):
+    # Stream the CSV in bounded chunks: score each chunk, write it with one
+    # multi-row insert and commit, so memory and transaction size stay flat.
+    check_header(file, PSYCHOMETRIC_COLUMNS)
+    reader = pd.read_csv(
+        file,
+        chunksize=chunk_size,
+        dtype={"STUDENT ID": str, "STUDENT NAME": str, "YEAR LEVEL": str},
+    )
+
+    rows_processed = 0
+    inserted_count = 0
+    skipped_students = []
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT NOW()")
+        started_at = cursor.fetchone()[0]
+
+        # Prefetch existing profiles for this academic year once; rows inserted
+        # by this upload are added as we go so in-file repeats are skipped too.
+        cursor.execute("SELECT student_id FROM student_profiles WHERE academic_year = %s", (academic_year,))
+        # (uq_sp_student_year still has the final say for concurrent uploads)
+        seen = {student_key(row[0]) for row in cursor.fetchall()}
+
+        for chunk in reader:
+            totals = score_answers(answers_from_frame(chunk, ANSWER_COLUMNS))
+            dominants = dominant_traits(totals)
+
+            rows = []
+            for idx, row in enumerate(chunk[["STUDENT ID", "STUDENT NAME", "YEAR LEVEL"]].itertuples(index=False)):
+                student_id = str(row[0]).strip()
+
+                # Skip if student profile already exists
+                key = student_key(student_id)
+                if key in seen:
+                    skipped_students.append(student_id)
+                    continue
+                seen.add(key)
+
+                scores = scores_to_dict(totals[idx])
+                rows.append((
+                    student_id,
+                    str(row[1]).strip(),
+                    json.dumps(scores),
+                    *scores.values(),
+                    dominants[idx],
+                    academic_year,
+                    str(row[2]).strip()
+                ))
+
+            if rows:
+                # Rows another upload inserted meanwhile hit the unique key and
+                # aren't counted as affected
+                cursor.executemany(INSERT_PROFILE_SQL, rows)
+                inserted = cursor.rowcount
+                if inserted < len(rows):
+                    # Rare (concurrent uploads): redo the chunk row by row to
+                    # name the students that were skipped
+                    connection.rollback()
+                    inserted = 0
+                    for values in rows:
+                        cursor.execute(INSERT_PROFILE_SQL, values)
+                        if cursor.rowcount:
+                            inserted += 1
+                        else:
+                            skipped_students.append(values[0])
+                inserted_count += inserted
+                bump_stats(cursor, profiles_completed=inserted)
+            connection.commit()
+
+            rows_processed += len(chunk)
+            if progress:
+                progress(rows_processed=rows_processed, inserted=inserted_count,
+                         skipped=len(skipped_students))
+
+        # Classes that already roster these students get their aggregates rebuilt
+        if inserted_count:
+            refresh_teachers(cursor, teachers_for_new_profiles(cursor, academic_year, started_at))
+        connection.commit()
+    finally:
+        cursor.close()
+
+    return {
+        "message": "Upload complete.",
+        "inserted": inserted_count,
+        "skipped": len(skipped_students),
+        "skipped_students": skipped_students
+    }
+
+
+MASTERLIST_COLUMNS = {"STUDENT ID", "STUDENT NAME", "SUBJECT", "ACADEMIC YEAR", "YEAR LEVEL"}
+
+
+def ingest_masterlist(connection, file, teacher_id, chunk_size=1000, progress=None):
+    # Load the roster into a per-connection staging table in bulk, then match,
+    # deduplicate and insert with set-based statements instead of per-row queries.
+    check_header(file, sorted(MASTERLIST_COLUMNS))
+    reader = pd.read_csv(
+        file,
+        chunksize=chunk_size,
+        dtype={"STUDENT ID": str, "SUBJECT": str, "ACADEMIC YEAR": str, "YEAR LEVEL": str},
+    )
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS masterlist_staging")
+        cursor.execute("""
+            CREATE TEMPORARY TABLE masterlist_staging (
+                row_no INT NOT NULL PRIMARY KEY,
+                student_id VARCHAR(50) NOT NULL,
+                subject VARCHAR(100),
+                academic_year VARCHAR(20),
+                year_level VARCHAR(50),
+                first_seen TINYINT NOT NULL DEFAULT 0,
+                matched TINYINT NOT NULL DEFAULT 0,
+                KEY (student_id)
+            )
+        """)
+
+        total = 0
+        seen = set()
+        for chunk in reader:
+            rows = []
+            for row in chunk[["STUDENT ID", "SUBJECT", "ACADEMIC YEAR", "YEAR LEVEL"]].itertuples(index=False):
+                student_id, subject, academic_year, year_level = (str(value).strip() for value in row)
+
+                # Only the first occurrence of a mapping in the file gets inserted
+                key = (student_id, subject, academic_year)
+                first_seen = key not in seen
+                seen.add(key)
+
+                rows.append((total, student_id, subject, academic_year, year_level, int(first_seen)))
+                total += 1
+
+            if rows:
+                cursor.executemany("""
+                    INSERT INTO masterlist_staging (row_no, student_id, subject, academic_year, year_level, first_seen)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, rows)
+
+            if progress:
+                progress(rows_processed=total)
+
+        # Lock order as on the other roster paths: teacher (aggregates), then the
+        # stats row. Committing first gives the reads below a snapshot taken
+        # after the lock, so a student that a concurrent masterlist just
+        # rostered is not counted as new again.
+        connection.commit()
+        lock_teachers(cursor, [teacher_id])
+        lock_stats(cursor)
+
+        # Match roster rows against psychometric profiles
+        cursor.execute("""
+            UPDATE masterlist_staging st
+            JOIN student_profiles sp ON sp.student_id = st.student_id
+            SET st.matched = 1
+        """)
+
+        cursor.execute("SELECT student_id FROM masterlist_staging WHERE matched = 0 ORDER BY row_no")
+        unmatched_students = [row[0] for row in cursor.fetchall()]
+
+        # Students rostered for the first time, for the admin stats snapshot
+        cursor.execute(*new_roster_students_query())
+        new_students = cursor.fetchone()[0]
+
+        # Insert matched mappings that this teacher doesn't already have
+        cursor.execute("""
+            INSERT INTO student_subjects (student_id, teacher_id, subject, academic_year, year_level)
+            SELECT st.student_id, %s, st.subject, st.academic_year, st.year_level
+            FROM masterlist_staging st
+            WHERE st.matched = 1 AND st.first_seen = 1
+              AND NOT EXISTS (
+                  SELECT 1 FROM student_subjects ss
+                  WHERE ss.student_id = st.student_id AND ss.teacher_id = %s
+                    AND ss.subject = st.subject AND ss.academic_year = st.academic_year
+              )
+            ORDER BY st.row_no
+        """, (teacher_id, teacher_id))
+        inserted_count = cursor.rowcount
+
+        refresh_teachers(cursor, [teacher_id])
+        bump_stats(cursor, total_students=new_students)
+        connection.commit()
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS masterlist_staging")
+    finally:
+        cursor.close()
+
+    if progress:
+        progress(rows_processed=total, inserted=inserted_count, skipped=len(unmatched_students))
+
+    return {
+        "matched": total - len(unmatched_students),
+        "unmatched": len(unmatched_students),
+        "unmatched_students": unmatched_students
+    }
@@ -0,0 +1,218 @@
+import contextvars
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class Job:
+    def __init__(self, kind, owner_id, store=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner_id = owner_id
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = {"rows_processed": 0, "inserted": 0, "skipped": 0, "errors": 0}
+        self.result = None
+        self.error = None
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._store = store
+        self._lock = threading.Lock()
+
+    def update(self, **counts):
+        with self._lock:
+            self.progress.update(counts)
+        self.save()
+
+    def save(self):
+        if self._store:
+            self._store.save(self)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "result": self.result,
+                "error": self.error,
+                "created_at": _timestamp(self.created_at),
+                "started_at": _timestamp(self.started_at),
+                "finished_at": _timestamp(self.finished_at)
+            }
+
+
+class JobStore:
+    # Job state in a local SQLite file, so any worker process on the host can
+    # answer a status poll and a restart can't silently lose a job.
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    owner_id INTEGER,
+                    status TEXT NOT NULL,
+                    progress TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def save(self, job):
+        with job._lock:
+            row = (
+                job.id, job.kind, job.owner_id, job.status, json.dumps(job.progress),
+                json.dumps(job.result, default=str), job.error, job.worker,
+                job.created_at, job.started_at, job.finished_at
+            )
+        with self._lock, self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+    def load(self, job_id):
+        with self._connect() as db:
+            row = db.execute("""
+                SELECT id, kind, owner_id, status, progress, result, error, worker,
+                       created_at, started_at, finished_at
+                FROM jobs WHERE id = ?
+            """, (job_id,)).fetchone()
+        if not row:
+            return None
+
+        job = Job(row[1], row[2])
+        (job.id, _, _, job.status, progress, result, job.error, job.worker,
+         job.created_at, job.started_at, job.finished_at) = row
+        job.progress = json.loads(progress)
+        job.result = json.loads(result) if result else None
+        return job
+
+    def prune(self, cutoff):
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))
+
+    def fail_orphans(self):
+        # Queued/running jobs whose worker process on this host is gone were
+        # interrupted (restart, crash); report them failed instead of pending forever
+        host = socket.gethostname()
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT id, worker FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+
+        orphans = [job_id for job_id, worker in rows
+                   if worker.rsplit(":", 1)[0] == host and not _pid_alive(int(worker.rsplit(":", 1)[1]))]
+        if orphans:
+            with self._lock, self._connect() as db:
+                db.executemany("""
+                    UPDATE jobs SET status = 'failed', finished_at = ?,
+                        error = 'Interrupted by a server restart. Please submit it again.'
+                    WHERE id = ?
+                """, [(time.time(), job_id) for job_id in orphans])
+        return len(orphans)
+
+
+class JobManager:
+    # In-process job queue backed by a thread pool, no external broker needed.
+    # Finished jobs are kept for `retention` seconds so clients can poll the result.
+    # With a `store`, state is shared by every worker process on the host:
+    # polls may land on any of them, and jobs cut off by a restart show as failed.
+
+    def __init__(self, max_workers=2, retention=3600, store=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.retention = retention
+        self.store = store
+
+        if store:
+            interrupted = store.fail_orphans()
+            if interrupted:
+                print(f"Marked {interrupted} interrupted background job(s) as failed")
+
+    def submit(self, kind, owner_id, func, *args, **kwargs):
+        job = Job(kind, owner_id, self.store)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job.save()
+        # Run in a copy of the submitter's context (e.g. LLM usage attribution)
+        self._executor.submit(contextvars.copy_context().run, self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store:
+            # Submitted by another worker process
+            job = self.store.load(job_id)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        with job._lock:
+            job.status = "running"
+            job.started_at = time.time()
+        job.save()
+        try:
+            result = func(job, *args, **kwargs)
+            with job._lock:
+                job.status = "completed"
+                job.result = result
+        except Exception as e:
+            traceback.print_exc()
+            with job._lock:
+                job.status = "failed"
+                job.error = str(e)
+                job.progress["errors"] += 1
+        finally:
+            with job._lock:
+                job.finished_at = time.time()
+            job.save()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if self.store:
+            self.store.prune(cutoff)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _timestamp(value):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(value)) if value else None
@@ -0,0 +1,394 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from scoring import TRAITS
+
+
+class LLMError(Exception):
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class LLMUnavailable(LLMError):
+    # Raised without calling the provider while the circuit breaker is open
+    pass
+
+
+def pooled_http_client(max_connections=20, max_keepalive=10, keepalive_expiry=30, connect_timeout=5, timeout=30):
+    # One connection pool for the whole process: keep-alive connections (and
+    # their TLS sessions) are reused across requests instead of re-handshaking
+    import httpx
+    import openai
+
+    return openai.DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout)
+    )
+
+
+class OpenAIProvider:
+    name = "openai"
+
+    def __init__(self, model, api_key=None, base_url=None, http_client=None):
+        import openai
+
+        self.model = model
+        self._errors = openai
+        # Retries are handled by LLMClient so they share one backoff/breaker policy
+        self._client = openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0, http_client=http_client)
+
+    def complete(self, prompt, max_tokens, timeout, usage=None):
+        try:
+            response = self._client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                timeout=timeout
+            )
+        except (self._errors.APITimeoutError, self._errors.APIConnectionError,
+                self._errors.RateLimitError, self._errors.InternalServerError) as e:
+            raise LLMError(str(e), retryable=True) from e
+        except self._errors.OpenAIError as e:
+            raise LLMError(str(e)) from e
+
+        if usage is not None and response.usage:
+            usage["prompt_tokens"] = response.usage.prompt_tokens
+            usage["completion_tokens"] = response.usage.completion_tokens
+        return response.choices[0].message.content.strip()
+
+    def stream(self, prompt, max_tokens, timeout, usage=None):
+        try:
+            response = self._client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                timeout=timeout,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in response:
+                # The usage-only chunk at the end has no choices
+                if usage is not None and chunk.usage:
+                    usage["prompt_tokens"] = chunk.usage.prompt_tokens
+                    usage["completion_tokens"] = chunk.usage.completion_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except (self._errors.APITimeoutError, self._errors.APIConnectionError,
+                self._errors.RateLimitError, self._errors.InternalServerError) as e:
+            raise LLMError(str(e), retryable=True) from e
+        except self._errors.OpenAIError as e:
+            raise LLMError(str(e)) from e
+
+
+class LocalProvider(OpenAIProvider):
+    # Any OpenAI-compatible server, e.g. Ollama's /v1 endpoint
+    name = "local"
+
+    def __init__(self, model, base_url="http://localhost:11434/v1", api_key=None, http_client=None):
+        super().__init__(model, api_key=api_key or "local", base_url=base_url, http_client=http_client)
+
+
+class StubProvider:
+    # Deterministic offline replies shaped like each endpoint expects, so every
+    # AI route can be exercised and benchmarked without network access.
+    name = "stub"
+
+    def __init__(self, model="stub", latency=0.0):
+        self.model = model
+        self.latency = latency
+
+    def complete(self, prompt, max_tokens, timeout, usage=None):
+        if self.latency:
+            time.sleep(self.latency)
+
+        tag = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        traits = [trait for trait in TRAITS if trait in prompt] or TRAITS[:1]
+
+        if "STUDENT_ID" in prompt:
+            student_ids = re.findall(r"^(\S+): \{", prompt, re.M)
+            return json.dumps({student_id: self._trait_insights(tag) for student_id in student_ids})
+        if "TraitName" in prompt:
+            return json.dumps(self._trait_insights(tag))
+        if re.search(r"\bJSON\b", prompt):
+            return json.dumps({"recommendation": f"Stub strategy for {' & '.join(traits)} ({tag})."})
+        if "Key Findings" in prompt:
+            return (
+                "Key Findings:\n"
+                + "".join(f"- Stub finding about {trait} ({tag}).\n" for trait in traits)
+                + "Recommendations:\n"
+                + "".join(f"- Stub recommendation for {trait} ({tag}).\n" for trait in traits)
+            ).strip()
+        return (
+            f"Student Recommendation: Stub study tip for {' & '.join(traits)} ({tag}).\n"
+            f"Teacher Strategy: Stub teaching strategy for {' & '.join(traits)} ({tag})."
+        )
+
+    @staticmethod
+    def _trait_insights(tag):
+        return {
+            trait: {
+                "interpretation": f"Stub interpretation of {trait} ({tag}).",
+                "recommendation": f"Stub recommendation for {trait} ({tag})."
+            }
+            for trait in TRAITS
+        }
+
+    def stream(self, prompt, max_tokens, timeout, usage=None):
+        # Same reply as complete(), delivered a word at a time
+        for delta in re.findall(r"\s*\S+", self.complete(prompt, max_tokens, timeout)):
+            yield delta
+
+
+class CircuitBreaker:
+    # closed -> open after `threshold` consecutive failures; after `reset_timeout`
+    # seconds one trial call is let through (half-open) and decides the next state.
+    # A trial that reports nothing within `trial_timeout` seconds (lost caller,
+    # stream never consumed) is given up and the next caller gets a new one.
+
+    def __init__(self, threshold=5, reset_timeout=30, trial_timeout=120):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.trial_timeout = trial_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "closed":
+                return True
+            if self.state == "open" and now - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self.trial_started_at = now
+                return True
+            if self.state == "half_open" and now - self.trial_started_at >= self.trial_timeout:
+                self.trial_started_at = now
+                return True
+            return False
+
+    def release_trial(self):
+        # The half-open trial ended without a verdict (rejected before the call,
+        # stream abandoned): back to open, so the next caller can take the trial
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class LLMClient:
+    # Single entry point for chat completions: applies the default timeout,
+    # retries transient errors with jittered exponential backoff and fails
+    # fast through the circuit breaker while the provider is down. Optional
+    # `admit()` runs before every model call (raise to reject it) and
+    # `observe(prompt_tokens, completion_tokens, latency, ok)` after it.
+
+    def __init__(self, provider, timeout=30, max_retries=2, backoff=0.5, max_backoff=8, breaker=None,
+                 admit=None, observe=None):
+        self.provider = provider
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.admit = admit
+        self.observe = observe
+
+    @property
+    def model(self):
+        return self.provider.model
+
+    @property
+    def cache_namespace(self):
+        # Keeps stub/local replies out of the OpenAI cache entries
+        if self.provider.name == "openai":
+            return self.provider.model
+        return f"{self.provider.name}:{self.provider.model}"
+
+    def _check_admission(self):
+        # Breaker first: while the provider is down, calls fail fast without
+        # spending rate-limit or quota budget
+        if not self.breaker.allow():
+            raise LLMUnavailable(f"LLM provider '{self.provider.name}' is unavailable (circuit open)")
+        if self.admit:
+            try:
+                self.admit()
+            except Exception:
+                self.breaker.release_trial()
+                raise
+
+    def _record(self, prompt, text, usage, started, ok):
+        if not self.observe:
+            return
+        try:
+            # Providers that don't report usage get a ~4 characters/token estimate
+            self.observe(
+                usage.get("prompt_tokens") or -(-len(prompt) // 4),
+                usage.get("completion_tokens") or -(-len(text) // 4),
+                time.monotonic() - started,
+                ok
+            )
+        except Exception as e:
+            print("LLM usage accounting failed:", e)
+
+    def _backoff(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        time.sleep(random.uniform(0, delay))
+
+    def complete(self, prompt, max_tokens=300, timeout=None):
+        self._check_admission()
+
+        timeout = timeout or self.timeout
+        usage = {}
+        started = time.monotonic()
+        text = ""
+        ok = False
+        # A half-open trial gets a single attempt
+        retries = 0 if self.breaker.state == "half_open" else self.max_retries
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    text = self.provider.complete(prompt, max_tokens, timeout, usage)
+                except LLMError as e:
+                    if not e.retryable:
+                        # Bad request / auth problems are ours, not the provider's health
+                        self.breaker.record_success()
+                        raise
+                    if attempt == retries:
+                        self.breaker.record_failure()
+                        raise
+                    self._backoff(attempt)
+                except Exception:
+                    # Unexpected reply (e.g. no content): not a healthy call either
+                    self.breaker.record_failure()
+                    raise
+                else:
+                    self.breaker.record_success()
+                    ok = True
+                    return text
+        finally:
+            self._record(prompt, text, usage, started, ok)
+
+    def stream(self, prompt, max_tokens=300, timeout=None):
+        # Admission is checked here, before the caller starts a response;
+        # the returned generator yields text deltas
+        self._check_admission()
+        return self._stream(prompt, max_tokens, timeout or self.timeout)
+
+    def _stream(self, prompt, max_tokens, timeout):
+        # A failed attempt is only retried before the first delta went out;
+        # after that the caller has partial output and must handle it.
+        usage = {}
+        parts = []
+        started = time.monotonic()
+        ok = False
+        retries = 0 if self.breaker.state == "half_open" else self.max_retries
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    for delta in self.provider.stream(prompt, max_tokens, timeout, usage):
+                        parts.append(delta)
+                        yield delta
+                except GeneratorExit:
+                    # Consumer went away (client disconnect, generator closed or
+                    # collected): no verdict on the provider, free a half-open trial
+                    self.breaker.release_trial()
+                    raise
+                except LLMError as e:
+                    if not e.retryable:
+                        self.breaker.record_success()
+                        raise
+                    if parts or attempt == retries:
+                        self.breaker.record_failure()
+                        raise
+                    self._backoff(attempt)
+                except Exception:
+                    self.breaker.record_failure()
+                    raise
+                else:
+                    self.breaker.record_success()
+                    ok = True
+                    return
+        finally:
+            self._record(prompt, "".join(parts), usage, started, ok)
+
+    def status(self):
+        return {
+            "provider": self.provider.name,
+            "model": self.provider.model,
+            "timeout_seconds": self.timeout,
+            "max_retries": self.max_retries,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures
+        }
+
+
+PROVIDERS = {
+    "openai": OpenAIProvider,
+    "local": LocalProvider,
+    "ollama": LocalProvider,
+    "stub": StubProvider,
+}
+
+
+def create_llm_client(env=os.environ, admit=None, observe=None):
+    name = env.get("LLM_PROVIDER", "openai").lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM_PROVIDER: {name}")
+
+    timeout = float(env.get("LLM_TIMEOUT", 30))
+
+    if name == "stub":
+        provider = StubProvider(env.get("LLM_MODEL", "stub"), latency=float(env.get("LLM_STUB_LATENCY", 0)))
+    else:
+        http_client = pooled_http_client(
+            max_connections=int(env.get("LLM_POOL_SIZE", 20)),
+            max_keepalive=int(env.get("LLM_POOL_KEEPALIVE", 10)),
+            keepalive_expiry=float(env.get("LLM_KEEPALIVE_EXPIRY", 30)),
+            connect_timeout=float(env.get("LLM_CONNECT_TIMEOUT", 5)),
+            timeout=timeout
+        )
+        if name == "openai":
+            provider = OpenAIProvider(env.get("LLM_MODEL", "gpt-3.5-turbo"), api_key=env.get("OPENAI_API_KEY"),
+                                      base_url=env.get("LLM_BASE_URL"), http_client=http_client)
+        else:
+            provider = LocalProvider(env.get("LLM_MODEL", "llama3"),
+                                     base_url=env.get("LLM_BASE_URL", "http://localhost:11434/v1"),
+                                     api_key=env.get("LLM_API_KEY"), http_client=http_client)
+
+    return LLMClient(
+        provider,
+        timeout=timeout,
+        max_retries=int(env.get("LLM_MAX_RETRIES", 2)),
+        backoff=float(env.get("LLM_BACKOFF", 0.5)),
+        breaker=CircuitBreaker(
+            threshold=int(env.get("LLM_BREAKER_THRESHOLD", 5)),
+            reset_timeout=float(env.get("LLM_BREAKER_RESET", 30)),
+            trial_timeout=float(env.get("LLM_BREAKER_TRIAL_TIMEOUT", 120))
+        ),
+        admit=admit,
+        observe=observe
+    )
@@ -0,0 +1,182 @@
+import atexit
+import hashlib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class LLMCache:
+    # Persistent LLM response cache on a local SQLite file. Entries are keyed on
+    # model + prompt, expire after `ttl` seconds and the least recently used
+    # ones are evicted past `max_entries`. Survives restarts and is shared by
+    # every worker process pointing at the same file, which also hosts short
+    # leases so only one process at a time fetches a given prompt.
+    # Lookups don't write: hit/miss counters are kept in memory and flushed
+    # every `flush_interval` seconds, and last_access is refreshed at most
+    # that often per entry.
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=5000, flush_interval=30):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = {"hits": 0, "misses": 0, "coalesced": 0}
+        self._pending_lock = threading.Lock()
+        self._flushed_at = time.time()
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS leases (
+                    key TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            db.execute("""
+                INSERT OR IGNORE INTO counters (name, value)
+                VALUES ('hits', 0), ('misses', 0), ('evictions', 0), ('coalesced', 0)
+            """)
+
+        atexit.register(self.flush)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def make_key(model, prompt):
+        # Only whitespace is normalized: letter case can be meaningful (IDs, names, quoted text)
+        normalized = " ".join(prompt.split())
+        return hashlib.sha256(f"{model}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, model, prompt):
+        key = self.make_key(model, prompt)
+        now = time.time()
+
+        with self._lock, self._connect() as db:
+            row = db.execute("SELECT response, created_at, last_access FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+
+            if row and now - row[2] > self.flush_interval:
+                db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+
+        self._count("hits" if row else "misses")
+        return row[0] if row else None
+
+    def _count(self, name):
+        with self._pending_lock:
+            self._pending[name] += 1
+            due = time.time() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        # Write the counters accumulated in this process to the shared file
+        with self._pending_lock:
+            pending = {name: value for name, value in self._pending.items() if value}
+            self._pending = dict.fromkeys(self._pending, 0)
+            self._flushed_at = time.time()
+        if not pending:
+            return
+
+        with self._lock, self._connect() as db:
+            db.executemany(
+                "UPDATE counters SET value = value + ? WHERE name = ?",
+                [(value, name) for name, value in pending.items()]
+            )
+
+    def set(self, model, prompt, response):
+        key = self.make_key(model, prompt)
+        now = time.time()
+
+        with self._lock, self._connect() as db:
+            db.execute("""
+                INSERT OR REPLACE INTO responses (key, model, response, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?)
+            """, (key, model, response, now, now))
+
+            count = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                evicted = db.execute("""
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY last_access LIMIT ?
+                    )
+                """, (count - self.max_entries,)).rowcount
+                db.execute("UPDATE counters SET value = value + ? WHERE name = 'evictions'", (evicted,))
+
+    def acquire_lease(self, model, prompt, ttl):
+        # True if this caller should fetch the prompt; False while another
+        # process holds an unexpired lease for it
+        key = self.make_key(model, prompt)
+        now = time.time()
+
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now))
+            return db.execute(
+                "INSERT OR IGNORE INTO leases (key, expires_at) VALUES (?, ?)", (key, now + ttl)
+            ).rowcount == 1
+
+    def release_lease(self, model, prompt):
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM leases WHERE key = ?", (self.make_key(model, prompt),))
+
+    def wait_for(self, model, prompt, timeout, interval=0.1):
+        # Poll for the lease holder's response. Returns None if the lease is
+        # released or expires without a response (e.g. the call failed).
+        key = self.make_key(model, prompt)
+        deadline = time.time() + timeout
+
+        while time.time() < deadline:
+            time.sleep(interval)
+            with self._lock, self._connect() as db:
+                row = db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                lease = None if row else db.execute("SELECT expires_at FROM leases WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._count("coalesced")
+                return row[0]
+            if not lease or lease[0] < time.time():
+                return None
+        return None
+
+    def stats(self):
+        self.flush()
+        with self._connect() as db:
+            counters = dict(db.execute("SELECT name, value FROM counters").fetchall())
+            entries = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "evictions": counters["evictions"],
+            "coalesced": counters["coalesced"],
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,238 @@
+import hashlib
+import os
+import re
+import sys
+import time
+
+import MySQLdb
+from dotenv import load_dotenv
+
+# Schema migrations: applies backend/migrations/NNNN_name.sql in order and
+# records each one in schema_migrations.
+#   python migrate.py                   apply everything pending
+#   python migrate.py up [version]      apply pending migrations up to version
+#   python migrate.py status            list applied/pending migrations
+#   python migrate.py baseline version  record migrations up to version as applied
+#                                       without running them (databases where they
+#                                       were already applied by hand)
+# Connection settings are the app's MYSQL_* environment variables.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Only one runner at a time per database
+LOCK_NAME = "insighted_schema_migrations"
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version varchar(20) NOT NULL,
+        name varchar(255) NOT NULL,
+        checksum char(64) NOT NULL,
+        applied_at datetime DEFAULT CURRENT_TIMESTAMP,
+        duration_ms int NOT NULL DEFAULT 0,
+        PRIMARY KEY (version)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+
+class Migration:
+    def __init__(self, path):
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.version, self.name = self.filename[:-len(".sql")].split("_", 1)
+        with open(path, encoding="utf-8") as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+    def statements(self):
+        return split_statements(self.sql)
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    migrations = [
+        Migration(os.path.join(directory, filename))
+        for filename in sorted(os.listdir(directory))
+        if re.match(r"^\d+_\w+\.sql$", filename)
+    ]
+    versions = [migration.version for migration in migrations]
+    duplicates = {version for version in versions if versions.count(version) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate migration versions: {', '.join(sorted(duplicates))}")
+    return migrations
+
+
+def split_statements(sql):
+    # Split on `;` outside quotes and comments; comment-only pieces are dropped
+    statements = []
+    current = []
+    quote = None
+    i = 0
+    while i < len(sql):
+        char = sql[i]
+        if quote:
+            current.append(char)
+            if char == "\\":
+                current.append(sql[i + 1:i + 2])
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in ("'", '"', "`"):
+            quote = char
+            current.append(char)
+        elif sql.startswith("--", i) or char == "#":
+            end = sql.find("\n", i)
+            i = len(sql) if end == -1 else end
+            continue
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = len(sql) if end == -1 else end + 2
+            continue
+        elif char == ";":
+            statements.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+        i += 1
+
+    statements.append("".join(current).strip())
+    return [statement for statement in statements if statement]
+
+
+def connect():
+    load_dotenv()
+    return MySQLdb.connect(
+        host=os.getenv("MYSQL_HOST", "localhost"),
+        port=int(os.getenv("MYSQL_PORT", 3306)),
+        user=os.getenv("MYSQL_USER", "root"),
+        passwd=os.getenv("MYSQL_PASSWORD", ""),
+        db=os.getenv("MYSQL_DB", "insighted"),
+        charset="utf8mb4"
+    )
+
+
+def applied_migrations(cursor):
+    cursor.execute(CREATE_TABLE_SQL)
+    cursor.execute("SELECT version, checksum FROM schema_migrations")
+    return dict(cursor.fetchall())
+
+
+def _lock(cursor):
+    cursor.execute("SELECT GET_LOCK(%s, 30)", (LOCK_NAME,))
+    if cursor.fetchone()[0] != 1:
+        raise RuntimeError("Another migration run holds the lock")
+
+
+def _unlock(cursor):
+    cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+    cursor.fetchone()
+
+
+def _record(cursor, migration, duration_ms):
+    cursor.execute("""
+        INSERT INTO schema_migrations (version, name, checksum, duration_ms)
+        VALUES (%s, %s, %s, %s)
+    """, (migration.version, migration.name, migration.checksum, duration_ms))
+
+
+def pending_migrations(migrations, applied, target=None):
+    return [
+        migration for migration in migrations
+        if migration.version not in applied and (target is None or migration.version <= target)
+    ]
+
+
+def migrate(connection, target=None, migrations=None, log=print):
+    # MySQL commits DDL implicitly, so a failed migration can leave its earlier
+    # statements applied; it is not recorded and the error names the statement.
+    migrations = load_migrations() if migrations is None else migrations
+    cursor = connection.cursor()
+    try:
+        _lock(cursor)
+        try:
+            applied = applied_migrations(cursor)
+            pending = pending_migrations(migrations, applied, target)
+            if not pending:
+                log("Schema is up to date.")
+
+            for migration in pending:
+                log(f"Applying {migration.filename} ...")
+                started = time.monotonic()
+                for number, statement in enumerate(migration.statements(), start=1):
+                    try:
+                        cursor.execute(statement)
+                    except MySQLdb.Error as e:
+                        connection.rollback()
+                        raise RuntimeError(
+                            f"{migration.filename} failed at statement {number}: {e}\n{statement}"
+                        ) from e
+                duration_ms = int((time.monotonic() - started) * 1000)
+                _record(cursor, migration, duration_ms)
+                connection.commit()
+                log(f"Applied {migration.filename} in {duration_ms} ms")
+            return [migration.version for migration in pending]
+        finally:
+            _unlock(cursor)
+    finally:
+        cursor.close()
+
+
+def baseline(connection, version, migrations=None, log=print):
+    migrations = load_migrations() if migrations is None else migrations
+    cursor = connection.cursor()
+    try:
+        _lock(cursor)
+        try:
+            applied = applied_migrations(cursor)
+            for migration in pending_migrations(migrations, applied, version):
+                _record(cursor, migration, 0)
+                log(f"Marked {migration.filename} as applied")
+            connection.commit()
+        finally:
+            _unlock(cursor)
+    finally:
+        cursor.close()
+
+
+def status(connection, migrations=None, log=print):
+    migrations = load_migrations() if migrations is None else migrations
+    cursor = connection.cursor()
+    try:
+        applied = applied_migrations(cursor)
+    finally:
+        cursor.close()
+
+    for migration in migrations:
+        checksum = applied.get(migration.version)
+        if checksum is None:
+            state = "pending"
+        elif checksum != migration.checksum:
+            # Applied migrations are immutable; add a new one instead of editing
+            state = "applied (file changed since)"
+        else:
+            state = "applied"
+        log(f"{migration.filename:<40} {state}")
+
+    known = {migration.version for migration in migrations}
+    for version in sorted(set(applied) - known):
+        log(f"{version:<40} applied (file missing)")
+
+
+def main(argv):
+    command = argv[0] if argv else "up"
+    connection = connect()
+    try:
+        if command == "up":
+            migrate(connection, argv[1] if len(argv) > 1 else None)
+        elif command == "status":
+            status(connection)
+        elif command == "baseline" and len(argv) == 2:
+            baseline(connection, argv[1])
+        else:
+            sys.exit("usage: python migrate.py [up [version] | status | baseline <version>]")
+    except RuntimeError as e:
+        sys.exit(str(e))
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,75 @@
+-- Base schema: every table the app used before 0001, as the app expects it.
+-- CREATE TABLE IF NOT EXISTS leaves an existing database untouched; on one
+-- that already has 0001+ applied by hand, record them with
+-- `python migrate.py baseline <version>` instead of running them.
+
+CREATE TABLE IF NOT EXISTS `users` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `name` varchar(100) DEFAULT NULL,
+  `email` varchar(191) DEFAULT NULL,
+  `password` varchar(255) DEFAULT NULL,
+  `role` varchar(50) DEFAULT NULL,
+  `created_at` datetime DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `email` (`email`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `processed_files` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `user_id` int NOT NULL,
+  `file_name` varchar(255) NOT NULL,
+  `date_processed` datetime DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `user_id` (`user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `uploaded_files` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `user_id` int NOT NULL,
+  `file_name` varchar(255) NOT NULL,
+  `academic_year` varchar(20) DEFAULT NULL,
+  `year_level` varchar(50) DEFAULT NULL,
+  `date_uploaded` datetime DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `user_id` (`user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- One row per student per academic year; trait_scores holds the OCEAN totals as JSON text
+CREATE TABLE IF NOT EXISTS `student_profiles` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `student_id` varchar(50) NOT NULL,
+  `name` varchar(255) DEFAULT NULL,
+  `trait_scores` text,
+  `dominant_trait` varchar(100) DEFAULT NULL,
+  `academic_year` varchar(20) DEFAULT NULL,
+  `year_level` varchar(50) DEFAULT NULL,
+  `created_at` datetime DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Teacher rosters from masterlist uploads; subject_code/name/email are only
+-- touched by the teacher edit/remove routes
+CREATE TABLE IF NOT EXISTS `student_subjects` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `student_id` varchar(50) NOT NULL,
+  `teacher_id` int NOT NULL,
+  `subject` varchar(100) DEFAULT NULL,
+  `subject_code` varchar(50) DEFAULT NULL,
+  `academic_year` varchar(20) DEFAULT NULL,
+  `year_level` varchar(50) DEFAULT NULL,
+  `name` varchar(255) DEFAULT NULL,
+  `email` varchar(191) DEFAULT NULL,
+  `created_at` datetime DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Generated key findings per teacher and subject (JSON arrays as text); latest row wins
+CREATE TABLE IF NOT EXISTS `insights` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `teacher_id` int NOT NULL,
+  `subject` varchar(100) NOT NULL,
+  `key_findings` text,
+  `recommendations` text,
+  `created_at` datetime DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
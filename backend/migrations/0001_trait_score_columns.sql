@@ -0,0 +1,19 @@
+-- Store the five OCEAN totals as typed columns so class aggregates can use AVG() in SQL.
+-- trait_scores (JSON text) is kept for older readers and stays in sync on insert.
+
+ALTER TABLE `student_profiles`
+  ADD COLUMN `extraversion` SMALLINT NULL AFTER `trait_scores`,
+  ADD COLUMN `neuroticism` SMALLINT NULL AFTER `extraversion`,
+  ADD COLUMN `agreeableness` SMALLINT NULL AFTER `neuroticism`,
+  ADD COLUMN `conscientiousness` SMALLINT NULL AFTER `agreeableness`,
+  ADD COLUMN `openness` SMALLINT NULL AFTER `conscientiousness`;
+
+-- Backfill existing profiles from the JSON column
+UPDATE `student_profiles`
+SET
+  `extraversion` = JSON_EXTRACT(`trait_scores`, '$.Extraversion'),
+  `neuroticism` = JSON_EXTRACT(`trait_scores`, '$.Neuroticism'),
+  `agreeableness` = JSON_EXTRACT(`trait_scores`, '$.Agreeableness'),
+  `conscientiousness` = JSON_EXTRACT(`trait_scores`, '$.Conscientiousness'),
+  `openness` = JSON_EXTRACT(`trait_scores`, '$.Openness')
+WHERE `extraversion` IS NULL AND JSON_VALID(`trait_scores`);
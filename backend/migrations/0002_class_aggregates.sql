@@ -0,0 +1,18 @@
+-- Materialized per-teacher class aggregates, refreshed by the ingest/delete paths.
+-- subject = '' / academic_year = '' rows hold the roll-up across all subjects / years.
+
+CREATE TABLE IF NOT EXISTS `class_aggregates` (
+  `teacher_id` int NOT NULL,
+  `subject` varchar(100) NOT NULL DEFAULT '',
+  `academic_year` varchar(20) NOT NULL DEFAULT '',
+  `student_count` int NOT NULL DEFAULT 0,
+  `extraversion_total` int NOT NULL DEFAULT 0,
+  `neuroticism_total` int NOT NULL DEFAULT 0,
+  `agreeableness_total` int NOT NULL DEFAULT 0,
+  `conscientiousness_total` int NOT NULL DEFAULT 0,
+  `openness_total` int NOT NULL DEFAULT 0,
+  `dominant_counts` json NOT NULL,
+  `last_upload` datetime DEFAULT NULL,
+  `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`teacher_id`, `subject`, `academic_year`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
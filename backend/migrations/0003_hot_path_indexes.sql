@@ -0,0 +1,10 @@
+-- Composite indexes for the teacher roster joins (student list, aggregate refresh,
+-- duplicate checks) so none of them fall back to full table scans.
+
+ALTER TABLE `student_subjects`
+  ADD KEY `idx_ss_teacher_subject_student` (`teacher_id`, `subject`, `student_id`),
+  ADD KEY `idx_ss_student_teacher` (`student_id`, `teacher_id`);
+
+ALTER TABLE `student_profiles`
+  ADD KEY `idx_sp_student_year` (`student_id`, `academic_year`),
+  ADD KEY `idx_sp_year_created` (`academic_year`, `created_at`);
@@ -0,0 +1,12 @@
+-- Precomputed per-trait AI insights for each student, filled by the batch job
+-- and by /assess/individual-insights on a miss. score_signature is the trait
+-- scores the insights were generated from; a different signature means stale.
+
+CREATE TABLE IF NOT EXISTS `student_insights` (
+  `student_id` varchar(50) NOT NULL,
+  `score_signature` varchar(64) NOT NULL,
+  `insights` json NOT NULL,
+  `model` varchar(100) DEFAULT NULL,
+  `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`student_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
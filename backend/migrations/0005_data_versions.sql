@@ -0,0 +1,15 @@
+-- Tag generated class-level AI output with the version of the data it was
+-- built from, so it is only regenerated when that data changes.
+
+ALTER TABLE `insights`
+  ADD COLUMN `data_version` varchar(40) DEFAULT NULL;
+
+-- Latest /assess/all class recommendation per user (built from their latest CSV)
+CREATE TABLE IF NOT EXISTS `class_recommendations` (
+  `user_id` int NOT NULL,
+  `data_version` varchar(40) NOT NULL,
+  `dominant_trait` varchar(100) NOT NULL,
+  `recommendation` json NOT NULL,
+  `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
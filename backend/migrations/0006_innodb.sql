@@ -0,0 +1,10 @@
+-- Databases created from insighted.sql have MyISAM tables: every write takes a
+-- table lock, so uploads and dashboard reads serialize. Rebuild them as InnoDB
+-- (row locks, transactions); a no-op rebuild for tables already on InnoDB.
+
+ALTER TABLE `users` ENGINE=InnoDB;
+ALTER TABLE `processed_files` ENGINE=InnoDB;
+ALTER TABLE `uploaded_files` ENGINE=InnoDB;
+ALTER TABLE `student_profiles` ENGINE=InnoDB;
+ALTER TABLE `student_subjects` ENGINE=InnoDB;
+ALTER TABLE `insights` ENGINE=InnoDB;
@@ -0,0 +1,16 @@
+-- Indexes for the remaining filtered/sorted reads: roster filters by subject and
+-- academic year (clusters, aggregate refresh), latest key findings per class,
+-- and the admin upload log. student_profiles(student_id, academic_year) is 0003.
+-- idx_ss_teacher_subject_year also serves every (teacher_id[, subject]) lookup of
+-- 0003's idx_ss_teacher_subject_student, which is dropped so roster writes
+-- maintain one index fewer.
+
+ALTER TABLE `student_subjects`
+  ADD KEY `idx_ss_teacher_subject_year` (`teacher_id`, `subject`, `academic_year`, `student_id`),
+  DROP KEY `idx_ss_teacher_subject_student`;
+
+ALTER TABLE `insights`
+  ADD KEY `idx_insights_teacher_subject_created` (`teacher_id`, `subject`, `created_at`);
+
+ALTER TABLE `uploaded_files`
+  ADD KEY `idx_uf_date_uploaded` (`date_uploaded`);
@@ -0,0 +1,7 @@
+-- Keyset pagination for the admin profile listing: newest first on
+-- (created_at, student_id), optionally within one academic year.
+
+ALTER TABLE `student_profiles`
+  ADD KEY `idx_sp_created_student` (`created_at`, `student_id`),
+  ADD KEY `idx_sp_year_created_student` (`academic_year`, `created_at`, `student_id`),
+  DROP KEY `idx_sp_year_created`;
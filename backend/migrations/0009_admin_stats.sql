@@ -0,0 +1,18 @@
+-- Single-row snapshot behind /admin/stats. Counters are adjusted by the
+-- ingest, delete and registration paths in their own transactions and
+-- recounted by admin_stats.reconcile_stats (first read, admin trigger, cron).
+
+CREATE TABLE IF NOT EXISTS `admin_stats` (
+  `id` tinyint NOT NULL DEFAULT 1,
+  `total_students` int NOT NULL DEFAULT 0,
+  `profiles_completed` int NOT NULL DEFAULT 0,
+  `files_uploaded` int NOT NULL DEFAULT 0,
+  `active_teachers` int NOT NULL DEFAULT 0,
+  `total_teachers` int NOT NULL DEFAULT 0,
+  `last_upload` datetime DEFAULT NULL,
+  `reconciled_at` datetime DEFAULT NULL,
+  `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT IGNORE INTO `admin_stats` (`id`) VALUES (1);
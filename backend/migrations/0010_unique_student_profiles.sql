@@ -0,0 +1,13 @@
+-- One profile per student per academic year, enforced by the database so
+-- concurrent uploads of the same year can't both insert a student. Existing
+-- duplicates (same ID under the column collation) keep their oldest row.
+
+DELETE sp FROM `student_profiles` sp
+JOIN `student_profiles` keep
+  ON keep.student_id = sp.student_id
+ AND keep.academic_year = sp.academic_year
+ AND keep.id < sp.id;
+
+ALTER TABLE `student_profiles`
+  ADD UNIQUE KEY `uq_sp_student_year` (`student_id`, `academic_year`),
+  DROP KEY `idx_sp_student_year`;
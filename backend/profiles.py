@@ -0,0 +1,83 @@
+import base64
+import json
+from datetime import datetime
+
+
+PROFILE_COLUMNS = ("student_id", "name", "dominant_trait", "academic_year", "year_level", "created_at")
+
+# Query-string filters accepted by the admin profile listing -> column
+PROFILE_FILTERS = {
+    "academic_year": "academic_year",
+    "year_level": "year_level",
+    "dominant_trait": "dominant_trait",
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, student_id):
+    # Opaque page token: the (created_at, student_id) of the last row served
+    raw = json.dumps([created_at.strftime("%Y-%m-%d %H:%M:%S"), student_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, student_id = json.loads(raw)
+        return datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S"), str(student_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid page cursor")
+
+
+def profile_filters(args):
+    return {key: args[key] for key in PROFILE_FILTERS if args.get(key) and args.get(key) != "All"}
+
+
+def _where(filters, search=None):
+    clauses = [f"{PROFILE_FILTERS[key]} = %s" for key in filters]
+    params = list(filters.values())
+    if search:
+        # Student ID prefix or name substring
+        clauses.append("(student_id LIKE %s OR name LIKE %s)")
+        params += [search + "%", "%" + search + "%"]
+    return clauses, params
+
+
+def profile_page_query(filters, after=None, limit=50, search=None):
+    # Newest first, keyset-paginated on (created_at, student_id): each page
+    # starts from an index position instead of skipping OFFSET rows.
+    # One extra row is fetched to tell whether another page follows.
+    clauses, params = _where(filters, search)
+    if after:
+        clauses.append("(created_at, student_id) < (%s, %s)")
+        params += list(after)
+
+    sql = f"""
+        SELECT {", ".join(PROFILE_COLUMNS)}
+        FROM student_profiles
+        {"WHERE " + " AND ".join(clauses) if clauses else ""}
+        ORDER BY created_at DESC, student_id DESC
+        LIMIT %s
+    """
+    return sql, tuple(params) + (limit + 1,)
+
+
+def estimate_profile_count(cursor, filters, search=None):
+    # Optimizer estimates instead of COUNT(*): table statistics when unfiltered,
+    # the EXPLAIN row estimate for a filtered listing
+    clauses, params = _where(filters, search)
+    if not clauses:
+        cursor.execute("""
+            SELECT TABLE_ROWS FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'student_profiles'
+        """)
+        row = cursor.fetchone()
+        return int(row[0] or 0) if row else 0
+
+    cursor.execute(f"EXPLAIN SELECT 1 FROM student_profiles WHERE {' AND '.join(clauses)}", tuple(params))
+    columns = [col[0] for col in cursor.description]
+    plan = dict(zip(columns, cursor.fetchone()))
+    return int((plan.get("rows") or 0) * float(plan.get("filtered") or 100) / 100)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+
+# IPIP-BFFM trait order (column order of the key matrix and of every score block)
+TRAITS = ["Extraversion", "Neuroticism", "Agreeableness", "Conscientiousness", "Openness"]
+
+# Matching numeric columns on student_profiles (same order as TRAITS)
+TRAIT_COLUMNS = [trait.lower() for trait in TRAITS]
+
+# OCEAN display order used by the chart endpoints
+OCEAN_ORDER = ["Openness", "Conscientiousness", "Extraversion", "Agreeableness", "Neuroticism"]
+
+NUM_ITEMS = 50
+
+# Trait totals run 10-50; three bands reproduce the README's Low 10-23 / Moderate 24-36 / High 37-50
+BAND_LABELS = ["Low", "Moderate", "High"]
+
+# Item key: (trait index, sign) for items 1..50, "-" items are reverse scored
+_ITEM_KEY = [
+    (1, "-"), (4, "+"), (0, "-"), (2, "+"), (3, "+"),
+    (1, "+"), (4, "-"), (0, "+"), (2, "-"), (3, "-"),
+] * 5
+
+# 50x5 sign/weight matrix: +1 keyed, -1 reverse keyed, 0 not part of the trait
+KEY_MATRIX = np.zeros((NUM_ITEMS, len(TRAITS)), dtype=np.int8)
+for _item, (_trait, _sign) in enumerate(_ITEM_KEY):
+    KEY_MATRIX[_item, _trait] = 1 if _sign == "+" else -1
+
+_REVERSED = KEY_MATRIX.sum(axis=1) < 0
+_WEIGHTS = np.abs(KEY_MATRIX).astype(np.int64)
+
+
+def answers_from_frame(df, columns):
+    # Non-numeric / missing answers count as 0, same as the old per-row parsing
+    block = df[columns].apply(pd.to_numeric, errors="coerce")
+    return block.fillna(0).to_numpy(dtype=np.int64)
+
+
+def answers_from_records(records):
+    if not records:
+        return np.zeros((0, NUM_ITEMS), dtype=np.int64)
+    return np.array(
+        [[int(record.get(f"Answer_{i}", 0)) for i in range(1, NUM_ITEMS + 1)] for record in records],
+        dtype=np.int64,
+    )
+
+
+def score_answers(answers):
+    # answers: (n_students x 50) raw responses -> (n_students x 5) trait totals
+    answers = np.asarray(answers, dtype=np.int64).reshape(-1, NUM_ITEMS)
+    valid = (answers >= 1) & (answers <= 5)
+    reversed_answers = np.where(valid, 6 - answers, 0)
+    adjusted = np.where(_REVERSED, reversed_answers, answers)
+    return adjusted @ _WEIGHTS
+
+
+def dominant_traits(totals):
+    # Ties keep every top trait, joined in TRAITS order ("Openness & Extraversion" style)
+    totals = np.asarray(totals).reshape(-1, len(TRAITS))
+    if totals.shape[0] == 0:
+        return []
+    is_top = totals == totals.max(axis=1, keepdims=True)
+    return [" & ".join(TRAITS[j] for j in np.flatnonzero(row)) for row in is_top]
+
+
+def scores_to_dict(row):
+    return {trait: int(score) for trait, score in zip(TRAITS, row)}
+
+
+def trait_bands(trait_scores, levels=3):
+    # Quantize each trait total into `levels` equal-width bands over 10-50
+    labels = BAND_LABELS if levels == 3 else [f"Band {i + 1} of {levels}" for i in range(levels)]
+    return {
+        trait: labels[min(levels - 1, max(0, (int(trait_scores[trait]) - 10) * levels // 40))]
+        for trait in TRAITS
+    }
@@ -0,0 +1,157 @@
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from scoring import TRAITS, TRAIT_COLUMNS, scores_to_dict, trait_bands
+
+
+# Same expression in SQL and Python: the scores an insight was generated from
+SIGNATURE_SQL = "CONCAT_WS(',', " + ", ".join(f"sp.{col}" for col in TRAIT_COLUMNS) + ")"
+
+UPSERT_INSIGHTS_SQL = """
+    INSERT INTO student_insights (student_id, score_signature, insights, model)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        score_signature = VALUES(score_signature),
+        insights = VALUES(insights),
+        model = VALUES(model)
+"""
+
+
+def score_signature(trait_scores):
+    return ",".join(str(int(trait_scores[trait])) for trait in TRAITS)
+
+
+def get_student_insights(cursor, student_id, trait_scores):
+    # Stored insights for the student, or None if missing or generated from other scores
+    cursor.execute(
+        "SELECT score_signature, insights FROM student_insights WHERE student_id = %s",
+        (student_id,)
+    )
+    row = cursor.fetchone()
+    if not row or row[0] != score_signature(trait_scores):
+        return None
+    return json.loads(row[1])
+
+
+def save_student_insights(cursor, rows, model):
+    # rows: [(student_id, trait_scores, insights)]; the caller commits
+    cursor.executemany(UPSERT_INSIGHTS_SQL, [
+        (student_id, score_signature(trait_scores), json.dumps(insights), model)
+        for student_id, trait_scores, insights in rows
+    ])
+
+
+def is_valid_insights(insights):
+    return isinstance(insights, dict) and all(
+        isinstance(insights.get(trait), dict) for trait in TRAITS
+    )
+
+
+def batch_insights_prompt(students):
+    lines = "\n".join(f"{student_id}: {json.dumps(scores)}" for student_id, scores in students)
+    return (
+        "You are a psychology-based teaching support AI.\n"
+        "For each student below, based on their Big Five trait scores, generate for each trait:\n"
+        "1. A one-sentence interpretation of what this score might say about the student's personality.\n"
+        "2. A one-sentence teaching recommendation to help teachers handle this student more effectively.\n"
+        "Just return a JSON object keyed by student ID like this:\n"
+        "{ \"STUDENT_ID\": { \"TraitName\": { \"interpretation\": \"...\", \"recommendation\": \"...\" } } }\n\n"
+        f"Students:\n{lines}"
+    )
+
+
+# A student has one profile per academic year; insights follow the latest one
+LATEST_PROFILE_ORDER = "academic_year DESC, created_at DESC, id DESC"
+
+
+def stale_students_query(teacher_id, subject=None):
+    # Students in the class without insights for their current (latest) scores
+    sql = f"""
+        SELECT sp.student_id, {", ".join(f"sp.{col}" for col in TRAIT_COLUMNS)}
+        FROM (
+            SELECT DISTINCT student_id FROM student_subjects
+            WHERE teacher_id = %s{" AND subject = %s" if subject else ""}
+        ) ss
+        JOIN student_profiles sp ON sp.id = (
+            SELECT p.id FROM student_profiles p
+            WHERE p.student_id = ss.student_id
+            ORDER BY {LATEST_PROFILE_ORDER}
+            LIMIT 1
+        )
+        LEFT JOIN student_insights si ON si.student_id = sp.student_id
+        WHERE si.student_id IS NULL OR si.score_signature <> {SIGNATURE_SQL}
+        ORDER BY sp.student_id
+    """
+    return sql, (teacher_id, subject) if subject else (teacher_id,)
+
+
+def precompute_class_insights(connection, complete, model, teacher_id, subject=None,
+                              batch_size=5, workers=4, progress=None, band_insights=None, band_levels=3):
+    # Generate insights for every stale student in the class: several students
+    # per prompt, a bounded number of prompts in flight, rows written and
+    # committed per batch from this thread (the DB connection isn't shared).
+    # With `band_insights(trait_scores)` students are grouped by banded
+    # profile instead and each group costs one (cacheable) call.
+    cursor = connection.cursor()
+    try:
+        cursor.execute(*stale_students_query(teacher_id, subject))
+        students = [(row[0], scores_to_dict(row[1:])) for row in cursor.fetchall()]
+
+        if band_insights:
+            groups = {}
+            for student_id, scores in students:
+                key = tuple(trait_bands(scores, band_levels).values())
+                groups.setdefault(key, []).append((student_id, scores))
+            batches = list(groups.values())
+
+            def run_batch(batch):
+                insights = band_insights(batch[0][1])
+                return {str(student_id): insights for student_id, _ in batch}
+        else:
+            batches = [students[i:i + batch_size] for i in range(0, len(students), batch_size)]
+
+            def run_batch(batch):
+                text = complete(batch_insights_prompt(batch), max_tokens=300 * len(batch))
+                return json.loads(text)
+
+        processed = 0
+        generated = 0
+        failed = []
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="insights-batch") as pool:
+            # copy_context keeps the caller's usage-accounting context in the pool threads
+            futures = {pool.submit(contextvars.copy_context().run, run_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    parsed = future.result()
+                except Exception as e:
+                    print("Insight batch failed:", e)
+                    parsed = {}
+
+                rows = []
+                for student_id, scores in batch:
+                    insights = parsed.get(str(student_id)) if isinstance(parsed, dict) else None
+                    if is_valid_insights(insights):
+                        rows.append((student_id, scores, insights))
+                    else:
+                        failed.append(student_id)
+
+                if rows:
+                    save_student_insights(cursor, rows, model)
+                    connection.commit()
+
+                processed += len(batch)
+                generated += len(rows)
+                if progress:
+                    progress(rows_processed=processed, inserted=generated, errors=len(failed))
+    finally:
+        cursor.close()
+
+    return {
+        "stale": len(students),
+        "generated": generated,
+        "failed": len(failed),
+        "failed_students": failed
+    }
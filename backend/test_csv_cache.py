@@ -0,0 +1,44 @@
+import pytest
+
+from csv_cache import AssessmentCache
+
+
+def answers(value):
+    return {f"Answer_{i}": value for i in range(1, 51)}
+
+
+def test_parse_errors_are_raised_and_not_cached(tmp_path):
+    path = tmp_path / "user_1_latest.csv"
+    path.write_text("not,an,assessment\n")
+    calls = []
+
+    def parse(file_path):
+        calls.append(file_path)
+        raise ValueError("Missing column: STUDENT ID")
+
+    cache = AssessmentCache(parse)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cache.load(str(path))
+    assert len(calls) == 2
+
+
+def test_parsed_students_are_scored_and_cached(tmp_path):
+    path = tmp_path / "user_1_latest.csv"
+    path.write_text("placeholder\n")
+    skipped = [{"row": 3, "student_id": "S1", "reason": "Duplicate student ID"}]
+    calls = []
+
+    def parse(file_path):
+        calls.append(file_path)
+        return [dict(answers(3), **{"STUDENT ID": "S1"})], skipped
+
+    cache = AssessmentCache(parse)
+    parsed = cache.load(str(path))
+
+    assert cache.load(str(path)) is parsed
+    assert len(calls) == 1
+    assert len(parsed.students) == 1
+    assert parsed.skipped == skipped
+    assert parsed.find("S1")[1].tolist() == [30] * 5
+    assert parsed.find("S2") is None
@@ -0,0 +1,130 @@
+import gc
+
+import pytest
+
+from llm import CircuitBreaker, LLMClient, LLMError, LLMUnavailable
+
+
+class FakeProvider:
+    name = "fake"
+    model = "fake-model"
+
+    def __init__(self):
+        self.error = None
+
+    def complete(self, prompt, max_tokens, timeout, usage=None):
+        if self.error:
+            raise self.error
+        return "ok"
+
+    def stream(self, prompt, max_tokens, timeout, usage=None):
+        if self.error:
+            raise self.error
+        yield "o"
+        yield "k"
+
+
+def make_client(threshold=2, reset_timeout=0, trial_timeout=120):
+    breaker = CircuitBreaker(threshold=threshold, reset_timeout=reset_timeout, trial_timeout=trial_timeout)
+    return LLMClient(FakeProvider(), max_retries=0, breaker=breaker), breaker
+
+
+def test_breaker_opens_after_threshold_and_recovers_through_half_open():
+    client, breaker = make_client(threshold=2, reset_timeout=60)
+    client.provider.error = LLMError("down", retryable=True)
+
+    for _ in range(2):
+        with pytest.raises(LLMError):
+            client.complete("x")
+    assert breaker.state == "open"
+
+    # Still inside reset_timeout: fail fast without reaching the provider
+    with pytest.raises(LLMUnavailable):
+        client.complete("x")
+
+    breaker.reset_timeout = 0
+    client.provider.error = None
+    assert client.complete("x") == "ok"
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_failed_half_open_trial_reopens():
+    client, breaker = make_client(threshold=1)
+    breaker.record_failure()
+    client.provider.error = LLMError("still down", retryable=True)
+
+    with pytest.raises(LLMError):
+        client.complete("x")
+    assert breaker.state == "open"
+
+
+def test_only_one_half_open_trial_at_a_time():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+
+def test_lost_half_open_trial_times_out():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0, trial_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.allow()
+    # The first trial never reported back; the next caller gets a new one
+    assert breaker.allow()
+
+
+def test_abandoned_stream_releases_half_open_trial():
+    client, breaker = make_client(threshold=1)
+    breaker.record_failure()
+
+    tokens = client.stream("x")
+    assert next(tokens) == "o"
+    assert breaker.state == "half_open"
+    tokens.close()
+    assert breaker.state == "open"
+
+    # Garbage-collected mid-stream
+    tokens = client.stream("x")
+    next(tokens)
+    del tokens
+    gc.collect()
+    assert breaker.state == "open"
+
+    assert "".join(client.stream("x")) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_unexpected_exception_counts_as_failure():
+    client, breaker = make_client(threshold=1)
+    breaker.record_failure()
+    client.provider.error = AttributeError("'NoneType' object has no attribute 'strip'")
+
+    with pytest.raises(AttributeError):
+        client.complete("x")
+    assert breaker.state == "open"
+
+
+def test_rejected_admission_releases_trial_and_open_breaker_skips_admission():
+    admitted = []
+
+    def admit():
+        admitted.append(True)
+        raise LLMError("quota")
+
+    client, breaker = make_client(threshold=1, reset_timeout=60)
+    client.admit = admit
+    breaker.record_failure()
+
+    with pytest.raises(LLMUnavailable):
+        client.complete("x")
+    assert admitted == []
+
+    breaker.reset_timeout = 0
+    with pytest.raises(LLMError):
+        client.complete("x")
+    assert admitted == [True]
+    assert breaker.state == "open"
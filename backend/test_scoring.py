@@ -0,0 +1,44 @@
+import numpy as np
+
+from scoring import TRAITS, dominant_traits, score_answers
+
+
+# Item key of the original per-answer scoring loop: (trait type, sign) for items 1..50
+OLD_ASSESSMENT = [
+    (2, "-"), (5, "+"), (1, "-"), (3, "+"), (4, "+"),
+    (2, "+"), (5, "-"), (1, "+"), (3, "-"), (4, "-"),
+] * 5
+
+OLD_TRAIT_MAP = {1: "Extraversion", 2: "Neuroticism", 3: "Agreeableness", 4: "Conscientiousness", 5: "Openness"}
+
+
+def old_ladder(answers):
+    totals = {trait: 0 for trait in OLD_TRAIT_MAP.values()}
+    for raw, (trait_type, math) in zip(answers, OLD_ASSESSMENT):
+        if math == "-":
+            score = {1: 5, 2: 4, 3: 3, 4: 2, 5: 1}.get(raw, 0)  # fallback for invalid input
+        else:
+            score = raw
+        totals[OLD_TRAIT_MAP[trait_type]] += score
+    return [totals[trait] for trait in TRAITS]
+
+
+def test_score_answers_matches_the_old_ladder():
+    rng = np.random.default_rng(7)
+    answers = rng.integers(1, 6, size=(200, 50))
+    # Missing / out-of-range answers as the CSV readers produce them
+    answers[0, :5] = 0
+    answers[1, 10:15] = 7
+
+    expected = [old_ladder(row) for row in answers.tolist()]
+    assert score_answers(answers).tolist() == expected
+
+
+def test_score_answers_bounds():
+    assert score_answers(np.full((1, 50), 3)).tolist() == [[30] * 5]
+    assert score_answers(np.zeros((0, 50))).shape == (0, 5)
+
+
+def test_dominant_traits_keeps_ties_in_trait_order():
+    totals = [[40, 20, 20, 20, 40], [10, 20, 30, 40, 50]]
+    assert dominant_traits(totals) == ["Extraversion & Openness", "Openness"]
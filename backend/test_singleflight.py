@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+from usage import QuotaExceeded
+
+
+def run_leader_and_waiter(flight, leader_func, waiter_func, retry_on=()):
+    results = {}
+    started = threading.Event()
+
+    def leader():
+        def func():
+            started.set()
+            time.sleep(0.1)
+            return leader_func()
+        try:
+            results["leader"] = flight.do("key", func, retry_on=retry_on)
+        except Exception as e:
+            results["leader"] = e
+
+    def waiter():
+        started.wait()
+        try:
+            results["waiter"] = flight.do("key", waiter_func, retry_on=retry_on)
+        except Exception as e:
+            results["waiter"] = e
+
+    threads = [threading.Thread(target=leader), threading.Thread(target=waiter)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_waiters_share_the_leaders_result():
+    flight = SingleFlight()
+    results = run_leader_and_waiter(flight, lambda: "reply", lambda: "not called")
+
+    assert results == {"leader": "reply", "waiter": "reply"}
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 1}
+
+
+def test_waiters_share_the_leaders_error():
+    flight = SingleFlight()
+    error = ValueError("bad reply")
+
+    def fail():
+        raise error
+
+    results = run_leader_and_waiter(flight, fail, lambda: "not called")
+
+    assert results["leader"] is error
+    assert results["waiter"] is error
+
+
+def test_quota_error_is_not_shared_with_waiters():
+    flight = SingleFlight()
+
+    def over_quota():
+        raise QuotaExceeded("Daily AI token quota reached")
+
+    results = run_leader_and_waiter(flight, over_quota, lambda: "own reply", retry_on=(QuotaExceeded,))
+
+    assert isinstance(results["leader"], QuotaExceeded)
+    assert results["waiter"] == "own reply"
+
+
+def test_nothing_is_kept_after_a_failure():
+    flight = SingleFlight()
+
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.do("key", lambda: "retried") == "retried"
@@ -0,0 +1,26 @@
+from usage import TokenBucket
+
+
+def test_token_bucket_allows_a_burst_up_to_capacity():
+    bucket = TokenBucket(rate=0, capacity=3)
+
+    assert [bucket.take() for _ in range(4)] == [True, True, True, False]
+
+
+def test_token_bucket_refills_at_rate(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("usage.time.monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=2, capacity=2)
+
+    assert bucket.take(2)
+    assert not bucket.take()
+    assert bucket.wait_time() == 0.5
+
+    now[0] += 0.5
+    assert bucket.take()
+    assert not bucket.take()
+
+    # Refill never exceeds capacity
+    now[0] += 60
+    assert bucket.take(2)
+    assert not bucket.take()
@@ -0,0 +1,194 @@
+import contextvars
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from llm import LLMError
+
+
+# (teacher_id, endpoint, rate_limited) of the request/job making model calls.
+# Thread pools don't inherit it on their own; submit via copy_context().run.
+_context = contextvars.ContextVar("llm_usage_context", default=(None, None, True))
+
+
+def set_usage_context(teacher_id, endpoint, rate_limited=True):
+    return _context.set((teacher_id, endpoint, rate_limited))
+
+
+@contextmanager
+def usage_context(teacher_id, endpoint, rate_limited=True):
+    token = set_usage_context(teacher_id, endpoint, rate_limited)
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class QuotaExceeded(LLMError):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    # `rate` tokens per second refill up to `capacity` (the allowed burst)
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, n=1):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= n:
+                self.tokens -= n
+                return True
+            return False
+
+    def wait_time(self, n=1):
+        with self._lock:
+            return max(0.0, (n - self.tokens) / self.rate) if self.rate else None
+
+
+class UsageLedger:
+    # Daily per-teacher, per-endpoint LLM usage in a local SQLite file, shared
+    # by every worker process so quotas and reports see all of them.
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS usage (
+                    day TEXT NOT NULL,
+                    teacher_id TEXT NOT NULL,
+                    endpoint TEXT NOT NULL,
+                    calls INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    rejected INTEGER NOT NULL DEFAULT 0,
+                    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                    completion_tokens INTEGER NOT NULL DEFAULT 0,
+                    latency_ms_total REAL NOT NULL DEFAULT 0,
+                    latency_ms_max REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, teacher_id, endpoint)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _today():
+        return time.strftime("%Y-%m-%d")
+
+    def record(self, teacher_id, endpoint, prompt_tokens, completion_tokens, latency, ok):
+        latency_ms = latency * 1000
+        with self._lock, self._connect() as db:
+            db.execute("""
+                INSERT INTO usage (day, teacher_id, endpoint, calls, failures, prompt_tokens,
+                                   completion_tokens, latency_ms_total, latency_ms_max)
+                VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?)
+                ON CONFLICT (day, teacher_id, endpoint) DO UPDATE SET
+                    calls = calls + 1,
+                    failures = failures + excluded.failures,
+                    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                    completion_tokens = completion_tokens + excluded.completion_tokens,
+                    latency_ms_total = latency_ms_total + excluded.latency_ms_total,
+                    latency_ms_max = MAX(latency_ms_max, excluded.latency_ms_max)
+            """, (self._today(), str(teacher_id), endpoint, 0 if ok else 1,
+                  prompt_tokens, completion_tokens, latency_ms, latency_ms))
+
+    def record_rejection(self, teacher_id, endpoint):
+        with self._lock, self._connect() as db:
+            db.execute("""
+                INSERT INTO usage (day, teacher_id, endpoint, rejected) VALUES (?, ?, ?, 1)
+                ON CONFLICT (day, teacher_id, endpoint) DO UPDATE SET rejected = rejected + 1
+            """, (self._today(), str(teacher_id), endpoint))
+
+    def tokens_today(self, teacher_id):
+        with self._connect() as db:
+            row = db.execute("""
+                SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0)
+                FROM usage WHERE day = ? AND teacher_id = ?
+            """, (self._today(), str(teacher_id))).fetchone()
+        return row[0]
+
+    def report(self, days=30):
+        since = time.strftime("%Y-%m-%d", time.localtime(time.time() - (days - 1) * 86400))
+        with self._connect() as db:
+            rows = db.execute("""
+                SELECT teacher_id, endpoint, SUM(calls), SUM(failures), SUM(rejected),
+                       SUM(prompt_tokens), SUM(completion_tokens),
+                       SUM(latency_ms_total), MAX(latency_ms_max)
+                FROM usage WHERE day >= ?
+                GROUP BY teacher_id, endpoint
+                ORDER BY SUM(prompt_tokens + completion_tokens) DESC
+            """, (since,)).fetchall()
+
+        return [{
+            "teacher_id": teacher_id,
+            "endpoint": endpoint,
+            "calls": calls,
+            "failures": failures,
+            "rejected": rejected,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "avg_latency_ms": round(latency_total / calls, 1) if calls else 0.0,
+            "max_latency_ms": round(latency_max, 1)
+        } for teacher_id, endpoint, calls, failures, rejected, prompt_tokens,
+              completion_tokens, latency_total, latency_max in rows]
+
+
+class UsageGuard:
+    # Admission + accounting hooks for LLMClient. Each teacher gets a token
+    # bucket of model calls (per process) and a daily token quota (shared via
+    # the ledger). Background jobs skip the bucket but still count against the quota.
+
+    def __init__(self, ledger, calls_per_minute=30, burst=10, daily_token_quota=0):
+        self.ledger = ledger
+        self.calls_per_minute = calls_per_minute
+        self.burst = burst
+        self.daily_token_quota = daily_token_quota
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, teacher_id):
+        with self._lock:
+            bucket = self._buckets.get(teacher_id)
+            if bucket is None:
+                bucket = self._buckets[teacher_id] = TokenBucket(self.calls_per_minute / 60, self.burst)
+            return bucket
+
+    def admit(self):
+        teacher_id, endpoint, rate_limited = _context.get()
+        teacher_id = teacher_id or "anonymous"
+
+        if rate_limited and self.calls_per_minute:
+            bucket = self._bucket(teacher_id)
+            if not bucket.take():
+                self.ledger.record_rejection(teacher_id, endpoint or "unknown")
+                raise QuotaExceeded("AI request rate limit reached", retry_after=bucket.wait_time())
+
+        if self.daily_token_quota and self.ledger.tokens_today(teacher_id) >= self.daily_token_quota:
+            self.ledger.record_rejection(teacher_id, endpoint or "unknown")
+            raise QuotaExceeded("Daily AI token quota reached")
+
+    def observe(self, prompt_tokens, completion_tokens, latency, ok):
+        teacher_id, endpoint, _ = _context.get()
+        self.ledger.record(teacher_id or "anonymous", endpoint or "unknown",
+                           prompt_tokens, completion_tokens, latency, ok)
@@ -9,6 +9,26 @@ const PsychometricUpload = () => {
   const [summary, setSummary] = useState<string | null>(null);
   const [skippedStudents, setSkippedStudents] = useState<string[]>([]);
   const [showModal, setShowModal] = useState(false);
+  const [progress, setProgress] = useState<string | null>(null);
+
+  // Poll the background ingest job until it finishes
+  const waitForJob = async (statusUrl: string) => {
+    while (true) {
+      const res = await fetch(`${import.meta.env.VITE_API_URL}${statusUrl}`, {
+        headers: {
+          Authorization: `Bearer ${localStorage.getItem("token")}`,
+        },
+      });
+      const job = await res.json();
+
+      if (!res.ok) throw new Error(job.error || "Failed to fetch job status.");
+      if (job.status === "completed") return job.result;
+      if (job.status === "failed") throw new Error(job.error || "Upload failed.");
+
+      setProgress(`Processed ${job.progress.rows_processed} rows...`);
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
 
   const handleSubmit = async () => {
     if (!file || !academicYear) return;
@@ -20,7 +40,7 @@ const PsychometricUpload = () => {
     setUploading(true);
     try {
       const res = await fetch(
-        `${import.meta.env.VITE_API_URL}/admin/upload-psychometric`,
+        `${import.meta.env.VITE_API_URL}/admin/upload-psychometric?async=1`,
         {
           method: "POST",
           headers: {
@@ -30,9 +50,10 @@ const PsychometricUpload = () => {
         }
       );
 
-      const data = await res.json();
+      const queued = await res.json();
 
       if (res.ok) {
+        const data = await waitForJob(queued.status_url);
         toast.success("Psychometric file uploaded successfully!");
 
         // Show modal with skipped students (if any)
@@ -44,13 +65,14 @@ const PsychometricUpload = () => {
         setFile(null);
         setAcademicYear("");
       } else {
-        toast.error(data.error || "Upload failed.");
+        toast.error(queued.error || "Upload failed.");
       }
     } catch (err) {
-      toast.error("Something went wrong.");
+      toast.error(err instanceof Error ? err.message : "Something went wrong.");
       console.error(err);
     } finally {
       setUploading(false);
+      setProgress(null);
     }
   };
 
@@ -94,7 +116,7 @@ const PsychometricUpload = () => {
           {uploading ? (
             <>
               <Loader2 className="w-4 h-4 animate-spin" />
-              Uploading...
+              {progress || "Uploading..."}
             </>
           ) : (
             "Upload File"
@@ -10,9 +10,32 @@ interface StudentProfile {
   created_at: string;
 }
 
+interface ProfilePage {
+  profiles: StudentProfile[];
+  next_cursor: string | null;
+  total_estimate: number;
+  total_is_exact: boolean;
+}
+
+const TRAITS = [
+  "Extraversion",
+  "Agreeableness",
+  "Conscientiousness",
+  "Neuroticism",
+  "Openness",
+];
+
+const PAGE_SIZE = 50;
+
 const StudentProfilesTable = () => {
   const [profiles, setProfiles] = useState<StudentProfile[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [total, setTotal] = useState({ count: 0, exact: true });
+  const [loading, setLoading] = useState(false);
   const [searchTerm, setSearchTerm] = useState("");
+  const [academicYear, setAcademicYear] = useState("");
+  const [yearLevel, setYearLevel] = useState("");
+  const [dominantTrait, setDominantTrait] = useState("");
   const [showModal, setShowModal] = useState(false);
   const [selectedProfile, setSelectedProfile] = useState<StudentProfile | null>(
     null
@@ -20,22 +43,43 @@ const StudentProfilesTable = () => {
   const [editName, setEditName] = useState("");
   const [editYearLevel, setEditYearLevel] = useState("");
 
+  // Filtering happens on the server; pages are fetched with the cursor
+  // returned by the previous one
+  const fetchPage = async (cursor: string | null) => {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (cursor) params.set("cursor", cursor);
+    if (searchTerm.trim()) params.set("q", searchTerm.trim());
+    if (academicYear.trim()) params.set("academic_year", academicYear.trim());
+    if (yearLevel.trim()) params.set("year_level", yearLevel.trim());
+    if (dominantTrait) params.set("dominant_trait", dominantTrait);
+
+    setLoading(true);
+    try {
+      const res = await fetch(
+        `${import.meta.env.VITE_API_URL}/admin/student-profiles?${params}`,
+        {
+          headers: {
+            Authorization: `Bearer ${localStorage.getItem("token")}`,
+          },
+        }
+      );
+      const data: ProfilePage = await res.json();
+      setProfiles((prev) =>
+        cursor ? [...prev, ...data.profiles] : data.profiles
+      );
+      setNextCursor(data.next_cursor);
+      setTotal({ count: data.total_estimate, exact: data.total_is_exact });
+    } catch (err) {
+      console.error("Failed to fetch profiles", err);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   useEffect(() => {
-    fetch(`${import.meta.env.VITE_API_URL}/admin/student-profiles`, {
-      headers: {
-        Authorization: `Bearer ${localStorage.getItem("token")}`,
-      },
-    })
-      .then((res) => res.json())
-      .then((data) => setProfiles(data))
-      .catch((err) => console.error("Failed to fetch profiles", err));
-  }, []);
-
-  const filteredProfiles = profiles.filter(
-    (p) =>
-      p.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      p.student_id.toLowerCase().includes(searchTerm.toLowerCase())
-  );
+    const timer = setTimeout(() => fetchPage(null), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm, academicYear, yearLevel, dominantTrait]);
 
   const handleEdit = (profile: StudentProfile) => {
     setSelectedProfile(profile);
@@ -82,13 +126,15 @@ const StudentProfilesTable = () => {
 
     if (res.ok) {
       setProfiles(profiles.filter((p) => p.student_id !== id));
+      setTotal((prev) => ({ ...prev, count: Math.max(prev.count - 1, 0) }));
     }
   };
 
   return (
     <div>
       <h2 className="text-xl font-semibold mb-4">
-        Total Profiles: {filteredProfiles.length}
+        Total Profiles: {total.exact ? "" : "~"}
+        {total.count.toLocaleString()}
       </h2>
 
       <div className="relative w-full max-w-amd mb-4">
@@ -102,6 +148,35 @@ const StudentProfilesTable = () => {
         />
       </div>
 
+      <div className="flex flex-wrap gap-3 mb-4">
+        <input
+          type="text"
+          value={academicYear}
+          onChange={(e) => setAcademicYear(e.target.value)}
+          placeholder="Academic Year (e.g. 2024-2025)"
+          className="px-3 py-2 border border-gray-300 rounded-md text-sm"
+        />
+        <input
+          type="text"
+          value={yearLevel}
+          onChange={(e) => setYearLevel(e.target.value)}
+          placeholder="Year Level"
+          className="px-3 py-2 border border-gray-300 rounded-md text-sm"
+        />
+        <select
+          value={dominantTrait}
+          onChange={(e) => setDominantTrait(e.target.value)}
+          className="px-3 py-2 border border-gray-300 rounded-md text-sm"
+        >
+          <option value="">All Traits</option>
+          {TRAITS.map((trait) => (
+            <option key={trait} value={trait}>
+              {trait}
+            </option>
+          ))}
+        </select>
+      </div>
+
       <div className="overflow-x-auto border rounded-lg bg-white shadow">
         <table className="min-w-full text-sm text-left">
           <thead className="bg-gray-100 font-semibold text-gray-700">
@@ -116,10 +191,10 @@ const StudentProfilesTable = () => {
             </tr>
           </thead>
           <tbody>
-            {filteredProfiles.length > 0 ? (
-              filteredProfiles.map((profile) => (
+            {profiles.length > 0 ? (
+              profiles.map((profile) => (
                 <tr
-                  key={profile.student_id}
+                  key={`${profile.student_id}-${profile.academic_year}`}
                   className="border-t hover:bg-gray-50"
                 >
                   <td className="px-4 py-2">{profile.student_id}</td>
@@ -152,7 +227,7 @@ const StudentProfilesTable = () => {
                   colSpan={7}
                   className="px-4 py-6 text-center text-gray-500 italic"
                 >
-                  No student profiles found.
+                  {loading ? "Loading..." : "No student profiles found."}
                 </td>
               </tr>
             )}
@@ -160,6 +235,18 @@ const StudentProfilesTable = () => {
         </table>
       </div>
 
+      {nextCursor && (
+        <div className="flex justify-center mt-4">
+          <button
+            onClick={() => fetchPage(nextCursor)}
+            disabled={loading}
+            className="px-4 py-2 text-sm border rounded-md hover:bg-gray-50 disabled:opacity-50"
+          >
+            {loading ? "Loading..." : "Load more"}
+          </button>
+        </div>
+      )}
+
       {/* Edit Modal */}
       {showModal && selectedProfile && (
         <div className="fixed inset-0 bg-black bg-opacity-50 flex justify-center items-center z-50">
@@ -22,19 +22,20 @@ export const InsightsTab = ({
   const [lastUpdated, setLastUpdated] = useState<string | null>(null);
   const [regeneratingFindings, setRegeneratingFindings] = useState(false);
 
-  // Initial fetch on tab load
+  // Initial fetch on tab load: only regenerate when nothing is stored yet or
+  // the class data changed since the stored copy was generated
   useEffect(() => {
-    if (user?.id) {
-      getInsightsFromDB();
-    }
+    if (!user?.id) return;
 
-    if (user?.id && activeSubject) {
-      fetchAndGenerateFindings();
-    }
+    getInsightsFromDB().then((stale) => {
+      if (stale && activeSubject) {
+        fetchAndGenerateFindings();
+      }
+    });
   }, [user, activeSubject]);
 
   // Fetch insights from database
-  const getInsightsFromDB = async () => {
+  const getInsightsFromDB = async (): Promise<boolean> => {
     try {
       const subjectParam = `&subject=${encodeURIComponent(
         activeSubject && activeSubject !== "All" ? activeSubject : "General"
@@ -54,13 +55,15 @@ export const InsightsTab = ({
       setKeyFindings(data.key_findings || []);
       setRecommendations(data.recommendations || []);
       setLastUpdated(data.last_updated || null);
+      return data.stale ?? true;
     } catch (err) {
       console.error("Failed to fetch insights:", err);
+      return false;
     }
   };
 
   // Regenerate AI findings
-  const fetchAndGenerateFindings = async () => {
+  const fetchAndGenerateFindings = async (force = false) => {
     setRegeneratingFindings(true);
     try {
       const subjectValue =
@@ -87,10 +90,13 @@ export const InsightsTab = ({
       console.log("📤 Sending classProfile:", classProfile);
 
       const res = await fetch(
-        `${import.meta.env.VITE_API_URL}/generate-key-findings`,
+        `${import.meta.env.VITE_API_URL}/generate-key-findings/stream`,
         {
           method: "POST",
-          headers: { "Content-Type": "application/json" },
+          headers: {
+            "Content-Type": "application/json",
+            Authorization: `Bearer ${localStorage.getItem("token")}`,
+          },
           body: JSON.stringify({
             class_profile: classProfile,
             teacher_id: user?.id || "", // <- fallback to empty string
@@ -98,14 +104,63 @@ export const InsightsTab = ({
               activeSubject && activeSubject !== "All"
                 ? activeSubject
                 : "General", // <- never undefined
+            force,
           }),
         }
       );
 
-      const data = await res.json();
+      if (!res.ok || !res.body) {
+        throw new Error(`Key findings request failed (${res.status})`);
+      }
+
+      // Read Server-Sent Events: render tokens as they arrive, then the saved result
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let streamed = "";
+      let data: {
+        key_findings?: string[];
+        recommendations?: string[];
+        last_updated?: string;
+      } | null = null;
+
+      while (!data) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split("\n\n");
+        buffer = events.pop() || "";
+
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const payload = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || "{}");
+
+          if (event === "token") {
+            streamed += payload.text;
+            const [findingsPart, recsPart = ""] = streamed.split("Recommendations:");
+            const toItems = (text: string) =>
+              text
+                .replace("Key Findings:", "")
+                .split("\n")
+                .map((line) => line.replace(/^[-\s]+/, "").trim())
+                .filter(Boolean);
+            setKeyFindings(toItems(findingsPart));
+            setRecommendations(toItems(recsPart));
+          } else if (event === "done") {
+            data = payload;
+          } else if (event === "error") {
+            throw new Error(payload.error);
+          }
+        }
+      }
+
+      if (!data) {
+        throw new Error("Key findings stream ended early");
+      }
       setKeyFindings(data.key_findings || []);
       setRecommendations(data.recommendations || []);
-      setLastUpdated(new Date().toLocaleString());
+      setLastUpdated(data.last_updated || new Date().toLocaleString());
 
       toast.success("AI findings updated successfully!");
     } catch (err) {
@@ -177,7 +232,7 @@ export const InsightsTab = ({
       {/* Regenerate + Download */}
       <section className="flex flex-col sm:flex-row gap-4">
         <button
-          onClick={fetchAndGenerateFindings}
+          onClick={() => fetchAndGenerateFindings(true)}
           disabled={regeneratingFindings}
           className={`px-4 py-2 rounded-md flex items-center gap-2 ${
             regeneratingFindings
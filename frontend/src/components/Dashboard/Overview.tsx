@@ -59,13 +59,13 @@ export const Overview = ({
   } | null>(null);
   const [loadingAI, setLoadingAI] = useState(true);
 
-  // Fetch Trait Averages
+  // Fetch stats, trait averages and dominant trait distribution in one request
   useEffect(() => {
-    const fetchTraitAverages = async () => {
+    const fetchDashboard = async () => {
       setLoadingAverages(true);
       try {
         const response = await fetch(
-          `${import.meta.env.VITE_API_URL}/assess/ocean-averages${
+          `${import.meta.env.VITE_API_URL}/teacher/dashboard${
             selectedSubject && selectedSubject !== "All"
               ? `?subject=${encodeURIComponent(selectedSubject)}`
               : ""
@@ -77,62 +77,17 @@ export const Overview = ({
           }
         );
         const data = await response.json();
-        setTraitAverages(data);
+        setStats(data.stats);
+        setTraitAverages(data.ocean_averages);
+        setDominantTraitData(data.dominant_distribution);
       } catch (err) {
-        console.error("Failed to fetch trait averages:", err);
+        console.error("Failed to fetch dashboard:", err);
       } finally {
         setLoadingAverages(false);
       }
     };
 
-    fetchTraitAverages();
-  }, [selectedSubject]);
-
-  // Fetch Stats
-  useEffect(() => {
-    const token = localStorage.getItem("token");
-
-    fetch(
-      `${import.meta.env.VITE_API_URL}/dashboard/stats${
-        selectedSubject && selectedSubject !== "All"
-          ? `?subject=${encodeURIComponent(selectedSubject)}`
-          : ""
-      }`,
-      {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      }
-    )
-      .then((res) => res.json())
-      .then((data) => setStats(data))
-      .catch((err) => console.error("Failed to fetch dashboard stats:", err));
-  }, [selectedSubject]);
-
-  // Fetch Dominant Trait Distribution
-  useEffect(() => {
-    const fetchDominantTraits = async () => {
-      try {
-        const response = await fetch(
-          `${import.meta.env.VITE_API_URL}/assess/dominant-distribution${
-            selectedSubject && selectedSubject !== "All"
-              ? `?subject=${encodeURIComponent(selectedSubject)}`
-              : ""
-          }`,
-          {
-            headers: {
-              Authorization: `Bearer ${localStorage.getItem("token")}`,
-            },
-          }
-        );
-        const data = await response.json();
-        setDominantTraitData(data);
-      } catch (err) {
-        console.error("Failed to fetch dominant traits:", err);
-      }
-    };
-
-    fetchDominantTraits();
+    fetchDashboard();
   }, [selectedSubject]);
 
   // Fetch AI Recommendation
@@ -145,6 +100,7 @@ export const Overview = ({
       method: "POST",
       headers: {
         "Content-Type": "application/json",
+        Authorization: `Bearer ${localStorage.getItem("token")}`,
       },
       body: JSON.stringify({
         dominant_trait: stats.most_common_trait.toLowerCase(),
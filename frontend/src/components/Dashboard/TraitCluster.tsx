@@ -21,64 +21,49 @@ const TraitCluster = ({ selectedSubject }: { selectedSubject: string }) => {
   const [interventions, setInterventions] = useState<{
     [trait: string]: string;
   }>({});
-  const [loadingTraits, setLoadingTraits] = useState<string[]>([]);
 
   useEffect(() => {
     setLoading(true);
-    fetch(
-      `${import.meta.env.VITE_API_URL}/teacher/clustered-students${
-        selectedSubject !== "All" ? `?subject=${selectedSubject}` : ""
-      }`,
-      {
-        headers: {
-          Authorization: `Bearer ${localStorage.getItem("token")}`,
-        },
-      }
-    )
-      .then((res) => res.json())
-      .then((data) => {
-        console.log("✅ Clustered students data received:", data);
-        setClusters(data);
-        setLoading(false);
-      })
-      .catch((err) => {
-        console.error("Failed to fetch clusters", err);
-        setLoading(false);
-      });
-  }, [selectedSubject]);
-
-  useEffect(() => {
-    const traits = Object.keys(clusters);
-
-    if (traits.length === 0) return;
 
-    const fetchAllInterventions = async () => {
-      const resultMap: { [trait: string]: string } = {};
-      setLoadingTraits(traits); // Show loading UI while fetching
-
-      for (const trait of traits) {
-        try {
-          const response = await fetch(
-            `${import.meta.env.VITE_API_URL}/teacher/trait-intervention?trait=${trait}`,
-            {
-              headers: {
-                Authorization: `Bearer ${localStorage.getItem("token")}`,
-              },
-            }
-          );
-          const data = await response.json();
-          resultMap[trait] = data.recommendation || "No intervention found.";
-        } catch (err) {
-          resultMap[trait] = "Error fetching intervention.";
+    // One request: the backend returns the clusters together with every
+    // cluster's intervention, generated concurrently
+    const fetchClusteredInterventions = async () => {
+      try {
+        const response = await fetch(
+          `${import.meta.env.VITE_API_URL}/teacher/clustered-interventions${
+            selectedSubject !== "All"
+              ? `?subject=${encodeURIComponent(selectedSubject)}`
+              : ""
+          }`,
+          {
+            headers: {
+              Authorization: `Bearer ${localStorage.getItem("token")}`,
+            },
+          }
+        );
+        const data = await response.json();
+        const received = data.clusters || {};
+        console.log("✅ Clustered students data received:", received);
+
+        const resultMap: { [trait: string]: string } = {};
+        for (const trait of Object.keys(received)) {
+          resultMap[trait] = data.errors?.[trait]
+            ? "Error fetching intervention."
+            : data.recommendations?.[trait] || "No intervention found.";
         }
-      }
 
-      setInterventions(resultMap);
-      setLoadingTraits([]); // Done loading
+        setClusters(received);
+        setInterventions(resultMap);
+      } catch (err) {
+        console.error("Failed to fetch clusters", err);
+        setClusters({});
+        setInterventions({});
+      }
+      setLoading(false);
     };
 
-    fetchAllInterventions();
-  }, [clusters]);
+    fetchClusteredInterventions();
+  }, [selectedSubject]);
 
   if (loading) {
     return <p className="text-sm text-gray-300">Loading trait clusters...</p>;
@@ -109,9 +94,7 @@ const TraitCluster = ({ selectedSubject }: { selectedSubject: string }) => {
             AI-Generated Teaching Intervention:
           </h3>
           <p className="text-sm text-blue-100 bg-gray-700 p-3 rounded mb-4 whitespace-pre-line">
-            {loadingTraits.includes(trait)
-              ? "Generating suggestion..."
-              : interventions[trait] || "No suggestion available."}
+            {interventions[trait] || "No suggestion available."}
           </p>
 
           <h4 className="text-sm font-semibold text-gray-400 mb-1">
@@ -20,6 +20,7 @@ export const FileUploadSidebar = () => {
   const [subjectCode, setSubjectCode] = useState("");
   const [subjectName, setSubjectName] = useState("");
   const [academicYear, setAcademicYear] = useState("");
+  const [progress, setProgress] = useState<string | null>(null);
 
   const onDrop = (acceptedFiles: File[]) => {
     if (acceptedFiles.length > 0) {
@@ -29,6 +30,25 @@ export const FileUploadSidebar = () => {
     }
   };
 
+  // Poll the background ingest job until it finishes
+  const waitForJob = async (statusUrl: string) => {
+    while (true) {
+      const res = await fetch(`${import.meta.env.VITE_API_URL}${statusUrl}`, {
+        headers: {
+          Authorization: `Bearer ${localStorage.getItem("token")}`,
+        },
+      });
+      const job = await res.json();
+
+      if (!res.ok) throw new Error(job.error || "Failed to fetch job status.");
+      if (job.status === "completed") return job.result;
+      if (job.status === "failed") throw new Error(job.error || "Upload failed.");
+
+      setProgress(`Processed ${job.progress.rows_processed} rows...`);
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
   const handleSubmit = async () => {
     if (!file) return;
 
@@ -46,7 +66,7 @@ export const FileUploadSidebar = () => {
       const token = localStorage.getItem("token");
 
       const response = await fetch(
-        `${import.meta.env.VITE_API_URL}/teacher/upload-masterlist`,
+        `${import.meta.env.VITE_API_URL}/teacher/upload-masterlist?async=1`,
         {
           method: "POST",
           headers: {
@@ -56,14 +76,16 @@ export const FileUploadSidebar = () => {
         }
       );
 
-      const result = await response.json();
+      const queued = await response.json();
 
       if (response.status === 409) {
-        toast.error(result.error || "Subject already uploaded.");
+        toast.error(queued.error || "Subject already uploaded.");
         return;
       }
 
       if (response.ok) {
+        // Large rosters are processed in the background; wait for the result
+        const result = await waitForJob(queued.status_url);
         setMessage(
           `✅ Masterlist uploaded. ${result.matched} students matched, ${result.unmatched} not found.`
         );
@@ -71,13 +93,16 @@ export const FileUploadSidebar = () => {
         toast.success("Masterlist uploaded successfully!");
         window.dispatchEvent(new Event("refreshStudentList"));
       } else {
-        setMessage(`❌ Upload failed: ${result.error || "Unknown error"}`);
+        setMessage(`❌ Upload failed: ${queued.error || "Unknown error"}`);
       }
     } catch (error) {
       toast.error("Upload failed. Please try again.");
-      setMessage("❌ Error uploading CSV.");
+      setMessage(
+        `❌ ${error instanceof Error ? error.message : "Error uploading CSV."}`
+      );
     } finally {
       setUploading(false);
+      setProgress(null);
     }
   };
 
@@ -202,7 +227,7 @@ export const FileUploadSidebar = () => {
               disabled={!file || uploading}
               className="w-full bg-blue-600 text-white py-2 px-4 rounded-md hover:bg-blue-700 transition-colors"
             >
-              {uploading ? "Processing..." : "Process Data"}
+              {uploading ? progress || "Processing..." : "Process Data"}
             </button>
 
             <button